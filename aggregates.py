@@ -0,0 +1,182 @@
+# ------------------------------------------------------------
+# Tổng hợp tương tác theo thời gian, cập nhật tăng dần (không tính lại trên toàn bộ log).
+#   - Độ phổ biến của sản phẩm và trọng số (user, sản phẩm) giảm dần theo hàm mũ:
+#       w(now) = sum_e weight_e * exp(-rate * (now - t_e)),   rate = ln 2 / half_life
+#     Lưu dạng "forward decay": mỗi sự kiện cộng weight_e * exp(rate * (t_e - t0)) với mốc t0
+#     cố định, nên thêm một sự kiện là O(1); khi đọc chỉ nhân chung với exp(-rate * (now - t0)).
+#     Khi số mũ quá lớn thì đổi mốc t0 (nhân lại mọi giá trị, hiếm khi xảy ra -> O(1) khấu hao).
+#   - Số lượt trong các cửa sổ trượt (mặc định 24h, 7D, 30D): mỗi cửa sổ giữ hàng đợi các
+#     sự kiện còn trong cửa sổ và bộ đếm theo sản phẩm; mỗi sự kiện vào và ra hàng đợi đúng
+#     một lần -> O(1) khấu hao.
+#   - Thứ tự xếp hạng theo trọng số giảm dần không phụ thuộc `now` (cùng một hệ số chung);
+#     `now` mặc định là thời điểm của sự kiện mới nhất đã thấy.
+# Cách dùng:
+#   aggregates = InteractionAggregates.build(purchases, half_life='30D')
+#   aggregates.add(user_id, product_id, timestamp)          # sự kiện mới
+#   aggregates.item_popularity().head(10)
+#   aggregates.window_counts('7D')
+#   collaborative_filtering(user_id, purchases, products, aggregates=aggregates)
+# ------------------------------------------------------------
+
+import logging
+import math
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HALF_LIFE = '30D'
+WINDOWS = ('24h', '7D', '30D')
+
+# số mũ tối đa trước khi đổi mốc t0 (exp(50) ~ 5e21, còn xa giới hạn float64)
+_REBASE_EXPONENT = 50.0
+
+
+def _seconds(timestamps) -> np.ndarray:
+    """Cột timestamp (chuỗi, datetime hoặc int64 ns) -> số giây (float64)."""
+    values = pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype='datetime64[ns]')
+    return values.view(np.int64) / 1e9
+
+
+def _timestamp_seconds(timestamp) -> float:
+    """Một timestamp (chuỗi, datetime, pd.Timestamp) -> số giây; nhanh hơn _seconds cho từng sự kiện."""
+    return pd.Timestamp(timestamp).value / 1e9
+
+
+class InteractionAggregates:
+    """
+    Độ phổ biến giảm dần theo thời gian, trọng số (user, sản phẩm) giảm dần và số lượt theo cửa sổ trượt.
+    - half_life: chu kỳ bán rã, vd '30D' (sau 30 ngày một sự kiện chỉ còn nửa trọng số)
+    - windows: độ dài các cửa sổ trượt, vd ('24h', '7D', '30D')
+    """
+
+    def __init__(self, half_life=DEFAULT_HALF_LIFE, windows=WINDOWS):
+        self.half_life = pd.Timedelta(half_life)
+        self.rate = math.log(2) / self.half_life.total_seconds()
+        self.windows = {name: pd.Timedelta(name).total_seconds() for name in windows}
+        self.t0 = None
+        self.last_time = None
+        self.num_events = 0
+        self._items = {}       # product_id -> trọng số forward-decay
+        self._user_items = {}  # user_id -> {product_id: trọng số forward-decay}
+        self._window_events = {name: deque() for name in self.windows}  # (giây, product_id)
+        self._window_counts = {name: {} for name in self.windows}
+
+    @classmethod
+    def build(cls, purchases: pd.DataFrame, browsing_history: pd.DataFrame = None, browse_weight: float = 0.0,
+              half_life=DEFAULT_HALF_LIFE, windows=WINDOWS) -> 'InteractionAggregates':
+        """
+        Dựng từ log có sẵn bằng pandas (cùng kết quả với gọi add() cho từng sự kiện).
+        Lượt mua có trọng số 1; lượt xem chỉ được tính khi browse_weight > 0.
+        """
+        start = time.perf_counter()
+        aggregates = cls(half_life, windows)
+        events = [purchases[['user_id', 'product_id', 'timestamp']].assign(weight=1.0)]
+        if browsing_history is not None and browse_weight > 0:
+            events.append(browsing_history[['user_id', 'product_id', 'timestamp']].assign(weight=browse_weight))
+        events = pd.concat(events, ignore_index=True).dropna()
+        if events.empty:
+            return aggregates
+        events['product_id'] = events['product_id'].astype(str)
+        events['t'] = _seconds(events['timestamp'])
+        events = events.sort_values('t', kind='stable', ignore_index=True)
+
+        # mốc t0 = sự kiện mới nhất: mọi số mũ <= 0, không tràn số
+        aggregates.t0 = aggregates.last_time = float(events['t'].iloc[-1])
+        aggregates.num_events = len(events)
+        events['w'] = events['weight'] * np.exp(aggregates.rate * (events['t'] - aggregates.t0))
+        aggregates._items = events.groupby('product_id')['w'].sum().to_dict()
+        user_items = events.groupby(['user_id', 'product_id'])['w'].sum()
+        for (user_id, product_id), w in user_items.items():
+            aggregates._user_items.setdefault(user_id, {})[product_id] = w
+
+        for name, length in aggregates.windows.items():
+            recent = events[events['t'] > aggregates.last_time - length]
+            aggregates._window_events[name].extend(zip(recent['t'].tolist(), recent['product_id'].tolist()))
+            aggregates._window_counts[name] = recent['product_id'].value_counts().to_dict()
+        logger.info("Aggregates: %d events, %d items, %d users built in %.2fs", len(events),
+                    len(aggregates._items), len(aggregates._user_items), time.perf_counter() - start)
+        return aggregates
+
+    def add(self, user_id, product_id, timestamp, weight: float = 1.0):
+        """Thêm một sự kiện: O(1) khấu hao. Sự kiện đến trễ (timestamp cũ) vẫn được tính đúng trọng số."""
+        t = _timestamp_seconds(timestamp)
+        product_id = str(product_id)
+        if self.t0 is None:
+            self.t0 = t
+        exponent = self.rate * (t - self.t0)
+        if exponent > _REBASE_EXPONENT:
+            self._rebase(t)
+            exponent = 0.0
+        w = weight * math.exp(exponent)
+        self._items[product_id] = self._items.get(product_id, 0.0) + w
+        user_items = self._user_items.setdefault(user_id, {})
+        user_items[product_id] = user_items.get(product_id, 0.0) + w
+        self.num_events += 1
+
+        self.last_time = t if self.last_time is None else max(self.last_time, t)
+        for name, length in self.windows.items():
+            if t > self.last_time - length:
+                # sự kiện đến trễ được xếp cuối hàng đợi nên có thể ra khỏi cửa sổ muộn hơn một chút
+                self._window_events[name].append((t, product_id))
+                counts = self._window_counts[name]
+                counts[product_id] = counts.get(product_id, 0) + 1
+        self._expire(self.last_time)
+
+    def advance(self, now):
+        """Bỏ các sự kiện đã ra khỏi cửa sổ tính tới thời điểm now (vd: gọi định kỳ khi không có sự kiện mới)."""
+        self._expire(_timestamp_seconds(now))
+
+    def _expire(self, now: float):
+        for name, length in self.windows.items():
+            events, counts = self._window_events[name], self._window_counts[name]
+            while events and events[0][0] <= now - length:
+                _, product_id = events.popleft()
+                counts[product_id] -= 1
+                if counts[product_id] == 0:
+                    del counts[product_id]
+
+    def _rebase(self, t0: float):
+        # đổi mốc: nhân mọi trọng số với exp(-rate * (t0 mới - t0 cũ))
+        factor = math.exp(-self.rate * (t0 - self.t0))
+        self._items = {key: w * factor for key, w in self._items.items()}
+        for user_id, items in self._user_items.items():
+            self._user_items[user_id] = {key: w * factor for key, w in items.items()}
+        self.t0 = t0
+
+    def _factor(self, now=None) -> float:
+        now = self.last_time if now is None else _timestamp_seconds(now)
+        return math.exp(-self.rate * (now - self.t0))
+
+    def item_popularity(self, now=None) -> pd.Series:
+        """Độ phổ biến giảm dần theo thời gian của từng sản phẩm tại now, sắp giảm dần."""
+        if not self._items:
+            return pd.Series(dtype=np.float64)
+        popularity = pd.Series(self._items, dtype=np.float64) * self._factor(now)
+        return popularity.sort_values(ascending=False)
+
+    def user_item_weights(self, user_id, now=None) -> pd.Series:
+        """Trọng số giảm dần của các sản phẩm user đã tương tác."""
+        items = self._user_items.get(user_id)
+        if not items:
+            return pd.Series(dtype=np.float64)
+        return pd.Series(items, dtype=np.float64) * self._factor(now)
+
+    def item_weights(self, user_ids, now=None) -> pd.Series:
+        """Tổng trọng số giảm dần theo sản phẩm của một nhóm user (vd: láng giềng trong collaborative)."""
+        totals = {}
+        for user_id in user_ids:
+            for product_id, w in self._user_items.get(user_id, {}).items():
+                totals[product_id] = totals.get(product_id, 0.0) + w
+        if not totals:
+            return pd.Series(dtype=np.float64)
+        return pd.Series(totals, dtype=np.float64) * self._factor(now)
+
+    def window_counts(self, window: str) -> pd.Series:
+        """Số lượt theo sản phẩm trong cửa sổ (tính tới sự kiện mới nhất hoặc lần advance() gần nhất)."""
+        if window not in self._window_counts:
+            raise ValueError(f"Unknown window: {window}")
+        return pd.Series(self._window_counts[window], dtype=np.int64).sort_values(ascending=False)
@@ -0,0 +1,340 @@
+# ------------------------------------------------------------
+# Chỉ mục lân cận gần đúng (ANN) IVF-PQ viết bằng NumPy, không cần dịch vụ ngoài.
+#   - IVF: k-means chia các vector sản phẩm thành `nlist` cụm; khi truy vấn chỉ duyệt
+#     `nprobe` cụm có tâm gần query nhất.
+#   - PQ: phần dư (vector - tâm cụm) được cắt thành `m` đoạn, mỗi đoạn mã hóa bằng 1 byte
+#     (256 codeword), nên mỗi sản phẩm chỉ tốn m byte. Điểm xấp xỉ của query q với sản phẩm x:
+#       q·x = q·c + sum_j q_j·codeword_j  (bảng tra q_j·codeword tính 1 lần cho mỗi query)
+#   - refine > 0: giữ lại vector gốc, tính lại điểm chính xác cho k * refine ứng viên tốt nhất.
+#   - metric 'ip' (tích vô hướng: user -> sản phẩm, xem user_item_index) hoặc 'cosine'
+#     (sản phẩm tương tự).
+# Lưu/nạp: mỗi mảng là một file .npy trong thư mục, nạp bằng mmap (không đọc cả file vào RAM).
+# Cách chạy (benchmark recall so với tìm kiếm chính xác):
+#   python ann_index.py --num-items 200000 --dim 128 --nlist 1024 --m 16 --out ann_benchmark.json
+#   python ann_index.py --source model      # vector sản phẩm từ MultiModalModel trên CSV của repo
+# ------------------------------------------------------------
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('ip', 'cosine')
+_ARRAYS = ('centroids', 'codebooks', 'codes', 'ids', 'offsets', 'vectors')
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def _nearest(x: np.ndarray, centers: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    """Chỉ số tâm gần nhất (L2) của từng dòng x, tính theo từng khối để giới hạn bộ nhớ."""
+    half_norms = 0.5 * (centers ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int64)
+    for lo in range(0, len(x), chunk):
+        out[lo:lo + chunk] = np.argmax(x[lo:lo + chunk] @ centers.T - half_norms, axis=1)
+    return out
+
+
+def kmeans(x: np.ndarray, k: int, iters: int = 20, seed: int = 0) -> np.ndarray:
+    """K-means (L2) đơn giản; cụm rỗng được khởi tạo lại bằng một điểm ngẫu nhiên."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    centers = x[rng.choice(len(x), k, replace=False)].astype(np.float32)
+    for _ in range(iters):
+        assign = _nearest(x, centers)
+        counts = np.bincount(assign, minlength=k)
+        # tổng theo cụm bằng reduceat trên dữ liệu đã sắp theo cụm (nhanh hơn np.add.at)
+        order = np.argsort(assign, kind='stable')
+        present = np.flatnonzero(counts)
+        sums = np.zeros_like(centers)
+        sums[present] = np.add.reduceat(x[order], np.searchsorted(assign[order], present), axis=0)
+        empty = counts == 0
+        centers = sums / np.maximum(counts, 1)[:, None]
+        if empty.any():
+            centers[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+    return centers.astype(np.float32)
+
+
+class IVFPQIndex:
+    """
+    Chỉ mục IVF-PQ.
+    - nlist: số cụm IVF; nprobe (lúc truy vấn) càng lớn -> recall cao hơn, chậm hơn
+    - m: số đoạn PQ (dim phải chia hết cho m); m lớn -> chính xác hơn, tốn m byte / sản phẩm
+    - refine: hệ số tính lại điểm chính xác (0 = không lưu vector gốc)
+    Các mảng sau khi build (sắp theo cụm):
+      centroids [nlist, dim], codebooks [m, 256, dim/m], codes uint8 [N, m],
+      ids [N] (mã số nguyên của sản phẩm, mặc định là vị trí dòng), offsets [nlist + 1] (cụm i = dòng offsets[i]:offsets[i+1]),
+      vectors [N, dim] (chỉ khi refine > 0)
+    """
+
+    def __init__(self, dim: int, nlist: int = 256, m: int = 16, metric: str = 'ip', refine: int = 0):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        if dim % m:
+            raise ValueError("dim must be divisible by m")
+        self.dim, self.nlist, self.m, self.metric, self.refine = dim, nlist, m, metric, refine
+        self.nprobe = 8
+        self.centroids = self.codebooks = self.codes = self.ids = self.offsets = self.vectors = None
+
+    def build(self, vectors: np.ndarray, ids: np.ndarray = None, train_size: int = 50_000,
+              iters: int = 15, seed: int = 0) -> 'IVFPQIndex':
+        """
+        Huấn luyện tâm cụm trên một mẫu `train_size` vector, codebook PQ trên mẫu nhỏ hơn
+        (64 điểm / codeword), rồi mã hóa toàn bộ.
+        """
+        start = time.perf_counter()
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.metric == 'cosine':
+            vectors = _normalize(vectors)
+        ids = np.arange(len(vectors)) if ids is None else np.asarray(ids, dtype=np.int64)
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(train_size, len(vectors)), replace=False)]
+
+        self.centroids = kmeans(sample, self.nlist, iters, seed)
+        self.nlist = len(self.centroids)
+        sample = sample[:256 * 64]
+        residuals = sample - self.centroids[_nearest(sample, self.centroids)]
+        sub = self.dim // self.m
+        self.codebooks = np.stack([
+            kmeans(residuals[:, j * sub:(j + 1) * sub], 256, iters, seed + j) for j in range(self.m)])
+        if self.codebooks.shape[1] < 256:
+            # ít dữ liệu hơn 256 điểm: lặp lại codeword cho đủ bảng 256
+            reps = -(-256 // self.codebooks.shape[1])
+            self.codebooks = np.tile(self.codebooks, (1, reps, 1))[:, :256]
+
+        assign = _nearest(vectors, self.centroids)
+        order = np.argsort(assign, kind='stable')
+        assign, vectors, self.ids = assign[order], vectors[order], ids[order]
+        self.offsets = np.searchsorted(assign, np.arange(self.nlist + 1)).astype(np.int64)
+        self.codes = self._encode(vectors - self.centroids[assign])
+        self.vectors = vectors if self.refine else None
+        logger.info("IVF-PQ built: %d vectors, nlist=%d, m=%d in %.1fs", len(vectors), self.nlist, self.m,
+                    time.perf_counter() - start)
+        return self
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        sub = self.dim // self.m
+        codes = np.empty((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest(np.ascontiguousarray(residuals[:, j * sub:(j + 1) * sub]), self.codebooks[j])
+        return codes
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: int = None):
+        """
+        Tìm top-k cho một lô query [Q, dim]. Trả về (ids [Q, k], scores [Q, k]), điểm giảm dần;
+        thiếu ứng viên thì ô còn lại là id -1, điểm -inf.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.metric == 'cosine':
+            queries = _normalize(queries)
+        nq, sub = len(queries), self.dim // self.m
+
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < self.nlist else \
+            np.tile(np.arange(self.nlist), (nq, 1))
+        # bảng tra [Q, m, 256]: q_j · codeword, dùng chung cho mọi cụm (metric tích vô hướng)
+        lut = np.einsum('qjd,jkd->qjk', queries.reshape(nq, self.m, sub), self.codebooks)
+        sizes = self.offsets[1:] - self.offsets[:-1]
+
+        out_ids = np.full((nq, k), -1, dtype=np.int64)
+        out_scores = np.full((nq, k), -np.inf, dtype=np.float32)
+        for qi in range(nq):
+            lists = probes[qi]
+            counts = sizes[lists]
+            if counts.sum() == 0:
+                continue
+            starts = self.offsets[lists]
+            # dòng của mọi sản phẩm trong các cụm được duyệt (mảng liên tiếp theo cụm)
+            rows = np.repeat(starts - np.r_[0, np.cumsum(counts)[:-1]], counts) + np.arange(counts.sum())
+            codes = np.take(self.codes, rows, axis=0)
+            scores = np.repeat(coarse[qi, lists], counts)
+            for j in range(self.m):
+                # np.take theo từng đoạn nhanh hơn fancy index 2 chiều lut[columns, codes]
+                scores += np.take(lut[qi, j], codes[:, j])
+            if self.refine and self.vectors is not None:
+                # giữ k * refine ứng viên tốt nhất theo điểm xấp xỉ, tính lại điểm chính xác
+                keep = min(len(rows), k * self.refine)
+                top = np.argpartition(-scores, keep - 1)[:keep]
+                rows, scores = rows[top], np.asarray(self.vectors[rows[top]]) @ queries[qi]
+            n = min(k, len(rows))
+            top = np.argpartition(-scores, n - 1)[:n]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            out_ids[qi, :n] = self.ids[rows[top]]
+            out_scores[qi, :n] = scores[top]
+        return out_ids, out_scores
+
+    def save(self, path: str):
+        """
+        Ghi chỉ mục vào thư mục `path` (meta.json + mỗi mảng một file .npy). meta.json liệt kê các
+        mảng đã ghi; file .npy cũ của lần lưu trước mà lần này không ghi (vd: vectors khi refine=0) bị xóa.
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = [name for name in _ARRAYS if getattr(self, name) is not None]
+        for name in _ARRAYS:
+            file = os.path.join(path, f'{name}.npy')
+            if name in arrays:
+                np.save(file, np.asarray(getattr(self, name)))
+            elif os.path.exists(file):
+                os.remove(file)
+        meta = {'dim': self.dim, 'nlist': self.nlist, 'm': self.m, 'metric': self.metric,
+                'refine': self.refine, 'nprobe': self.nprobe, 'arrays': arrays}
+        # ghi meta.json sau cùng: thư mục chỉ "hợp lệ" khi các mảng đã ghi xong
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'IVFPQIndex':
+        """Nạp chỉ mục đã lưu; mmap=True thì codes/vectors chỉ được đọc từ đĩa khi truy cập."""
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        index = cls(meta['dim'], meta['nlist'], meta['m'], meta['metric'], meta['refine'])
+        index.nprobe = meta['nprobe']
+        for name in meta.get('arrays', _ARRAYS):
+            if name == 'vectors' and not meta['refine']:
+                continue
+            setattr(index, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None))
+        return index
+
+
+def user_item_index(item_vectors: np.ndarray, item_bias: np.ndarray, ids=None, **params) -> IVFPQIndex:
+    """
+    Chỉ mục user -> sản phẩm cho điểm multi-modal U[u] @ item_vectors.T + item_bias
+    (MultiModalModel.item_representations): ghép bias thành một chiều thêm của vector sản phẩm,
+    query tương ứng là [U[u], 1] (xem user_queries). Số chiều được đệm 0 cho chia hết m.
+    """
+    augmented = user_item_vectors(item_vectors, item_bias, params.get('m', 16))
+    return IVFPQIndex(augmented.shape[1], metric='ip', **params).build(augmented, ids)
+
+
+def user_item_vectors(item_vectors: np.ndarray, item_bias: np.ndarray, m: int = 16) -> np.ndarray:
+    """Vector sản phẩm đã ghép bias và đệm 0 đúng như user_item_index dùng (để tính điểm chính xác)."""
+    pad = (-(item_vectors.shape[1] + 1)) % m
+    return np.hstack([item_vectors, item_bias[:, None], np.zeros((len(item_vectors), pad))]).astype(np.float32)
+
+
+def user_queries(index, user_vectors: np.ndarray) -> np.ndarray:
+    """Query tương ứng với user_item_index: [U[u], 1, 0...]. index: IVFPQIndex hoặc số chiều của nó."""
+    dim = index if isinstance(index, int) else index.dim
+    queries = np.zeros((len(user_vectors), dim), dtype=np.float32)
+    queries[:, :user_vectors.shape[1]] = user_vectors
+    queries[:, user_vectors.shape[1]] = 1.0
+    return queries
+
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int = 10, metric: str = 'ip', chunk: int = 256):
+    """Tìm kiếm chính xác (nhân ma trận toàn bộ), dùng làm chuẩn để đo recall."""
+    if metric == 'cosine':
+        vectors, queries = _normalize(vectors), _normalize(queries)
+    out = np.empty((len(queries), k), dtype=np.int64)
+    for lo in range(0, len(queries), chunk):
+        scores = queries[lo:lo + chunk] @ vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        out[lo:lo + chunk] = np.take_along_axis(top, order, axis=1)
+    return out
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Tỉ lệ trung bình của top-k chính xác xuất hiện trong top-k tìm được."""
+    return float(np.mean([len(np.intersect1d(f, t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def benchmark(vectors: np.ndarray, queries: np.ndarray, k: int = 10, nlist: int = 256, m: int = 16,
+              metric: str = 'ip', refine: int = 0, nprobes=(1, 2, 4, 8, 16, 32, 64), save: str = None,
+              build=None) -> dict:
+    """
+    Đo thời gian build, độ trễ truy vấn theo lô và recall@k so với exact_search cho từng nprobe.
+    save: thư mục lưu chỉ mục vừa build (tùy chọn).
+    build: hàm không tham số trả về chỉ mục cần đo (vd: user_item_index); mặc định dựng
+    IVFPQIndex trực tiếp trên `vectors`. Chỉ mục phải được dựng trên đúng `vectors`.
+    """
+    start = time.perf_counter()
+    truth = exact_search(vectors, queries, k, metric)
+    exact_s = time.perf_counter() - start
+
+    if build is None:
+        build = lambda: IVFPQIndex(vectors.shape[1], nlist, m, metric, refine).build(vectors)
+    start = time.perf_counter()
+    index = build()
+    build_s = time.perf_counter() - start
+    if save:
+        index.save(save)
+
+    results = []
+    for nprobe in nprobes:
+        if nprobe > index.nlist:
+            break
+        start = time.perf_counter()
+        found, _ = index.search(queries, k, nprobe)
+        elapsed = time.perf_counter() - start
+        results.append({'nprobe': nprobe, f'recall@{k}': recall_at_k(found, truth),
+                        'ms_per_query': 1000 * elapsed / len(queries)})
+        logger.info("nprobe=%d: %s", nprobe, results[-1])
+    return {
+        'num_items': len(vectors), 'dim': vectors.shape[1], 'num_queries': len(queries), 'k': k,
+        'nlist': index.nlist, 'm': m, 'metric': metric, 'refine': refine,
+        'build_s': build_s, 'bytes_per_item': m + (4 * vectors.shape[1] if refine else 0),
+        'exact_ms_per_query': 1000 * exact_s / len(queries),
+        'results': results,
+    }
+
+
+def _clustered_vectors(num_items: int, dim: int, num_clusters: int = 200, seed: int = 0) -> np.ndarray:
+    # dữ liệu thử có cấu trúc cụm (giống embedding thật hơn là nhiễu đều)
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dim)).astype(np.float32)
+    return centers[rng.integers(0, num_clusters, num_items)] + \
+        0.5 * rng.normal(size=(num_items, dim)).astype(np.float32)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark IVF-PQ: recall so với tìm kiếm chính xác')
+    parser.add_argument('--source', choices=('synthetic', 'model'), default='synthetic',
+                        help='model: vector sản phẩm của MultiModalModel trên CSV của repo')
+    parser.add_argument('--num-items', type=int, default=100_000)
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--num-queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--nlist', type=int, default=256)
+    parser.add_argument('--m', type=int, default=16)
+    parser.add_argument('--metric', choices=METRICS, default='ip')
+    parser.add_argument('--refine', type=int, default=0)
+    parser.add_argument('--save', default=None, help='thư mục lưu chỉ mục sau khi build')
+    parser.add_argument('--out', default='ann_benchmark.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    rng = np.random.default_rng(1)
+    build = None
+    if args.source == 'model':
+        from batch_scoring import compute_item_matrix
+        from model import MultiModalModel
+        from shared_data import load_csv_frames
+
+        frames = load_csv_frames('.')
+        model = MultiModalModel(frames['users']['user_id'].nunique(), frames['products']['product_id'].nunique())
+        model.eval()
+        item_vectors, item_bias = compute_item_matrix(model, frames['products'])
+        # đo chính user_item_index (ghép bias), recall so với điểm chính xác U @ item_vectors.T + item_bias
+        vectors = user_item_vectors(item_vectors, item_bias, args.m)
+        build = lambda: user_item_index(item_vectors, item_bias, nlist=args.nlist, m=args.m, refine=args.refine)
+        users = model.user_emb.weight.detach().numpy()
+        queries = user_queries(vectors.shape[1],
+                               users[rng.choice(len(users), min(args.num_queries, len(users)), replace=False)])
+    else:
+        vectors = _clustered_vectors(args.num_items, args.dim)
+        queries = _clustered_vectors(args.num_queries, args.dim, seed=2)
+
+    report = benchmark(vectors.astype(np.float32), queries, args.k, args.nlist, args.m, args.metric, args.refine,
+                       save=args.save, build=build)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
@@ -1,56 +1,141 @@
 # ------------------ IMPORTS (Dòng ~16–20) ------------------
 # Flask: web framework; render_template/request/flash/redirect/url_for cho flow web
-# pandas: đọc/ xử lý CSV -> DataFrame
+# snapshot: dữ liệu CSV (DataFrame) + model, tự nạp lại khi có dữ liệu mới
 # torch: chạy model PyTorch (multi-modal)
-# import từ model.py: các hàm/mô hình gợi ý dùng trong app
-from flask import Flask, render_template, request, flash, redirect, url_for
-import pandas as pd
-import torch
-from model import collaborative_filtering, content_based_filtering, hybrid_recommendation, MultiModalModel
+# import từ recommenders.py (chỉ cần pandas); mô hình multi-modal (model.py, kéo theo torch) chỉ được
+# import ở nơi dùng: build_model và thuật toán multi-modal
+from flask import Flask, render_template, request, flash, redirect, url_for, Response
+import math
+import os
+from recommenders import collaborative_filtering, content_based_filtering, hybrid_recommendation
+from recommendation_store import RecommendationStore
+from session_recommender import session_based_recommendation
+from two_stage import two_stage_recommendation
+from serving import DeadlineExecutor, parse_budgets, popular_recommendation
+from metrics import timed, incr, render_prometheus
+from snapshot import SnapshotManager
 import logging
 
 # ------------------ APP + LOGGER (Dòng ~22–26) ------------------
 app = Flask(__name__)              # khởi app Flask
 app.secret_key = 'your-secret-key' # cần cho flash/session (dev only)
-logging.basicConfig(level=logging.DEBUG)
+# mức log đọc từ biến môi trường (mặc định INFO); đặt LOG_LEVEL=DEBUG khi cần xem chi tiết
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
 logger = logging.getLogger(__name__)  # logger cho file này
 
 # ------------------ LOAD DATA + MODEL (Dòng ~29–37) ------------------
-# đọc CSV (users, products, ảnh, purchases, browsing)
-users = pd.read_csv('users_expanded.csv')
-products = pd.read_csv('products_expanded.csv')
-product_images = pd.read_csv('product_images_expanded.csv')
-purchases = pd.read_csv('purchases_expanded.csv')
-browsing_history = pd.read_csv('browsing_history_expanded.csv')
-
-# khởi model multi-modal với kích thước dựa trên số user/product
-num_users = users['user_id'].nunique()
-num_products = products['product_id'].nunique()
-model = MultiModalModel(num_users, num_products)
+# Dữ liệu + model nằm trong một "snapshot" (xem snapshot.py). Thread nền theo dõi các CSV,
+# khi có dữ liệu mới thì dựng snapshot mới rồi đổi tham chiếu, không cần restart server.
+# Mỗi request lấy snapshot MỘT lần ở đầu và dùng nó tới cuối.
+def build_model(num_users, num_products):
+    # khởi model multi-modal với kích thước dựa trên số user/product
+    from model import MultiModalModel
+    model = MultiModalModel(num_users, num_products)
+    model.eval()
+    return model
+
+def multi_modal_recommendation(*args):
+    # thuật toán multi-modal (model.py): chỉ import khi được gọi, sau lần đầu là tra sys.modules
+    from model import multi_modal_recommendation
+    return multi_modal_recommendation(*args)
+
+# RECSYS_SHARED_DATA=1: chế độ nhiều worker (xem gunicorn.conf.py, shared_data.py).
+# Dữ liệu được nạp 1 lần ở process cha dưới dạng mảng số trong shared memory,
+# các worker fork ra chỉ đọc chung một bản (chế độ này không hot reload).
+SHARED_DATA = os.environ.get('RECSYS_SHARED_DATA') == '1'
+# RECSYS_CF_TOP_M > 0: collaborative/hybrid chỉ dùng top-M láng giềng từ chỉ mục MinHash/LSH
+# (xem user_index.py) thay vì mọi user mua chung sản phẩm; 0 = cách tính chính xác ban đầu
+# và snapshot không dựng chỉ mục láng giềng
+CF_TOP_M = int(os.environ.get('RECSYS_CF_TOP_M', 0))
+# RECSYS_TIME_DECAY=1: collaborative/hybrid tính lượt mua theo trọng số giảm dần theo thời gian
+# (bảng tổng hợp tính sẵn trong snapshot, xem aggregates.py); 0 = mỗi lượt mua tính như nhau
+# và snapshot không dựng bảng tổng hợp
+TIME_DECAY = os.environ.get('RECSYS_TIME_DECAY', '0') == '1'
+# tham số dựng snapshot. Gợi ý theo phiên (xem session_recommender.py): khoảng cách tối đa giữa
+# 2 lượt xem cùng phiên (vd: 30min, 7D) và số sản phẩm kế tiếp giữ lại cho mỗi sản phẩm
+SNAPSHOT_PARAMS = {'session_gap': os.environ.get('RECSYS_SESSION_GAP', '7D'),
+                   'session_top_n': int(os.environ.get('RECSYS_SESSION_TOP_N', 20)),
+                   'user_index': CF_TOP_M > 0,
+                   'time_decay': TIME_DECAY}
+if SHARED_DATA:
+    from shared_data import prefork_load
+    shared_frames = prefork_load('.', manifest_path=os.environ.get('RECSYS_SHM_MANIFEST'))
+    snapshots = SnapshotManager('.', model_factory=build_model, initial_frames=shared_frames.frames(),
+                                **SNAPSHOT_PARAMS)
+    # đưa trọng số vào shared memory để các worker dùng chung, và "đóng băng" các object
+    # đã tạo để GC của worker không ghi vào chúng (giữ copy-on-write)
+    import gc
+    snapshots.current().model.share_memory()
+    gc.freeze()
+else:
+    snapshots = SnapshotManager('.', model_factory=build_model,
+                                poll_interval=float(os.environ.get('RECSYS_RELOAD_INTERVAL', 30)), **SNAPSHOT_PARAMS)
+    # RECSYS_HOT_RELOAD=0 để tắt việc tự nạp lại
+    if os.environ.get('RECSYS_HOT_RELOAD', '1') == '1':
+        snapshots.start()
+
+# số ứng viên mỗi nguồn cho thuật toán two-stage (xem two_stage.py); form có thể gửi num_candidates
+NUM_CANDIDATES = int(os.environ.get('RECSYS_NUM_CANDIDATES', 100))
+# giới hạn trên của num_candidates từ form: chi phí neural mỗi request không vượt quá mức này
+NUM_CANDIDATES_MAX = int(os.environ.get('RECSYS_NUM_CANDIDATES_MAX', 500))
+
+# chạy thuật toán trong thread pool với deadline theo thuật toán (xem serving.py); quá hạn hoặc lỗi thì
+# trả kết quả rẻ hơn: hybrid -> collaborative -> sản phẩm phổ biến tính sẵn.
+# RECSYS_BUDGETS ghi đè budget mặc định, vd: "multi-modal=2,two-stage=1.5" (giây)
+# RECSYS_HEAVY_WORKERS: số thread riêng cho multi-modal/two-stage (không chiếm thread của thuật toán rẻ)
+server = DeadlineExecutor(max_workers=int(os.environ.get('RECSYS_SERVING_WORKERS', 4)),
+                          heavy_workers=int(os.environ.get('RECSYS_HEAVY_WORKERS', 2)),
+                          budgets=parse_budgets(os.environ.get('RECSYS_BUDGETS', '')),
+                          fallback_budget=float(os.environ.get('RECSYS_FALLBACK_BUDGET', 0.5)))
+
+# kho gợi ý tính sẵn (xem recommendation_store.py); dùng khi form gửi mode=precomputed
+store = RecommendationStore(os.environ.get('RECSYS_STORE', 'recommendations.sqlite'))
+
+def parse_filter(form):
+    # bộ lọc tùy chọn từ form: categories (nhiều giá trị), min_price, max_price, min_rating, max_rating
+    # giá trị không phải số hữu hạn >= 0 (vd: 'abc', 'nan', '-5') -> ValueError nêu tên trường
+    spec = {}
+    categories = form.getlist('categories')
+    if categories:
+        spec['categories'] = categories
+    for key in ('min_price', 'max_price', 'min_rating', 'max_rating'):
+        if form.get(key):
+            try:
+                value = float(form[key])
+            except ValueError:
+                value = math.nan
+            if not math.isfinite(value) or value < 0:
+                raise ValueError(f'{key} must be a non-negative number!')
+            spec[key] = value
+    return spec
 
 # ------------------ ROUTE: index (Dòng ~39–45) ------------------
 @app.route('/')
 def index():
     # hiển thị trang chủ, truyền danh sách products (list of dict) sang template
-    return render_template('index.html', products=products.to_dict(orient='records'))
+    return render_template('index.html', products=snapshots.current().product_records)
 
 # ------------------ ROUTE: /recommend (Dòng ~47–82) ------------------
 @app.route('/recommend', methods=['POST'])
 def get_recommendations():
+    # snapshot dữ liệu của request này; hot reload giữa chừng không ảnh hưởng
+    snap = snapshots.current()
+    products = snap.products
     try:
         # nhận form: user_id, algorithm
         user_id = int(request.form['user_id'])
         algorithm = request.form['algorithm']
-        logger.debug(f"Processing request for user_id: {user_id}, algorithm: {algorithm}")
+        logger.debug("Processing request for user_id: %s, algorithm: %s", user_id, algorithm)
 
         # kiểm tra user tồn tại
-        if user_id not in users['user_id'].values:
+        if user_id not in snap.user_ids:
             flash('User ID not found!')
             return redirect(url_for('index'))
 
         # LẤY lịch sử tương tác (mua + xem)
-        purchased_product_ids = purchases[purchases['user_id'] == user_id]['product_id'].unique()
-        browsed_product_ids = browsing_history[browsing_history['user_id'] == user_id]['product_id'].unique()
+        with timed('history_lookup', 'web'):
+            purchased_product_ids = snap.purchased_by_user.get(user_id, [])
+            browsed_product_ids = snap.browsed_by_user.get(user_id, [])
 
         # tập các sản phẩm user đã tương tác, thêm cột nguồn (Purchased/Browsed)
         interacted_products = products[products['product_id'].isin(purchased_product_ids) |
@@ -58,43 +143,91 @@ def get_recommendations():
         interacted_products['source'] = interacted_products['product_id'].apply(
             lambda x: 'Purchased' if x in purchased_product_ids else 'Browsed'
         )
-        logger.debug(f"Interacted products: {interacted_products['product_id'].tolist()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Interacted products: %s", interacted_products['product_id'].tolist())
+
+        # mode=precomputed: chỉ tra cứu kho tính sẵn, chỉ tính trực tiếp khi user không có trong snapshot
+        mode = request.form.get('mode', 'live')
+        recommendations = None
+        if mode == 'precomputed':
+            cached = store.lookup(user_id, algorithm=algorithm)
+            if cached is not None:
+                # ghép lại thông tin sản phẩm, giữ nguyên thứ hạng trong snapshot
+                recommendations = cached.merge(products, on='product_id', how='inner')
+            else:
+                logger.debug("User %s not in snapshot; computing %s live", user_id, algorithm)
 
-        # CHỌN thuật toán tương ứng để sinh recommendations
-        if algorithm == 'collaborative':
+        neighbor_index = snap.user_index  # None khi CF_TOP_M = 0
+        aggregates = snap.aggregates  # None khi TIME_DECAY tắt
+        # bộ lọc category/giá/rating -> mask theo dòng của products, tính bằng bitmap của snapshot;
+        # các thuật toán chỉ tính điểm cho sản phẩm thỏa mask
+        try:
+            spec = parse_filter(request.form)
+        except ValueError as e:
+            flash(str(e))
+            return redirect(url_for('index'))
+        product_filter = snap.attribute_index.mask(spec) if spec else None
+
+        # CÁC thuật toán, mỗi cái là một hàm không tham số để chạy trong thread pool với deadline
+        num_candidates = NUM_CANDIDATES
+        if algorithm == 'two-stage' and request.form.get('num_candidates'):
+            try:
+                num_candidates = int(request.form['num_candidates'])
+            except ValueError:
+                num_candidates = 0
+            if num_candidates < 1:
+                flash('num_candidates must be a positive integer!')
+                return redirect(url_for('index'))
+            num_candidates = min(num_candidates, NUM_CANDIDATES_MAX)
+        recommenders = {
             # dựa vào hành vi người dùng khác
-            recommendations = collaborative_filtering(user_id, purchases, products)
-        elif algorithm == 'content-based':
+            'collaborative': lambda: collaborative_filtering(user_id, snap.purchases, products, neighbor_index,
+                                                             CF_TOP_M, product_filter, aggregates),
             # dựa vào đặc trưng sản phẩm / mô tả
-            recommendations = content_based_filtering(user_id, purchases, browsing_history, products)
-        elif algorithm == 'hybrid':
+            'content-based': lambda: content_based_filtering(user_id, snap.purchases, snap.browsing_history,
+                                                             products, product_filter),
             # kết hợp collaborative + content-based
-            recommendations = hybrid_recommendation(user_id, purchases, browsing_history, products)
-        elif algorithm == 'multi-modal':
+            'hybrid': lambda: hybrid_recommendation(user_id, snap.purchases, snap.browsing_history, products,
+                                                    neighbor_index, CF_TOP_M, product_filter, aggregates),
+            # sản phẩm hay được xem tiếp theo sau phiên xem gần nhất của user (tra bảng, không chạy model)
+            'session-based': lambda: session_based_recommendation(user_id, snap.session_index, products),
             # dùng model PyTorch: truyền user, product ids, texts, images -> lấy score
-            product_ids = torch.LongTensor(products['product_id'].values) - 1  # 0-index cho embedding
-            texts = products['description'].tolist()
-            with torch.no_grad():
-                outputs = model(
-                    torch.LongTensor([user_id - 1]),
-                    product_ids,
-                    texts,
-                    edge_index=None,
-                    product_images_df=product_images
-                )
-            # chuyển embedding -> điểm (hiện tại dùng mean)
-            scores = outputs.mean(dim=1).cpu().numpy()
-            recommendations = products.copy()
-            recommendations['score'] = scores
-            recommendations['source'] = 'Multi-Modal'
+            'multi-modal': lambda: multi_modal_recommendation(user_id, snap.model, products, snap.product_images,
+                                                              product_filter),
+            # ứng viên từ collaborative/content-based/popular, chỉ chúng đi qua model multi-modal
+            'two-stage': lambda: two_stage_recommendation(user_id, snap.model, snap.purchases,
+                                                          snap.browsing_history, products, snap.product_images,
+                                                          num_candidates, product_filter, snap.popular_counts),
+        }
+        # sản phẩm phổ biến tính sẵn (bỏ sản phẩm user đã tương tác): kết quả dự phòng cuối cùng
+        popular = lambda: popular_recommendation(snap.popular_counts, products,
+                                                 set(purchased_product_ids) | set(browsed_product_ids),
+                                                 product_filter)
+        if recommendations is not None:
+            pass
+        elif algorithm in recommenders:
+            # CHẠY thuật toán được chọn trong budget; quá hạn/lỗi -> kết quả dự phòng rẻ hơn (ghi vào metrics)
+            recommendations, served_by = server.run(algorithm, recommenders, popular)
+            if algorithm == 'session-based' and served_by == algorithm and recommendations.empty:
+                # user không có phiên xem gần đây có sản phẩm kế tiếp -> nói rõ và gợi ý sản phẩm phổ biến
+                incr('fallback', algorithm)
+                incr('fallback_to_popular', algorithm)
+                flash('No recent browsing session for this user; showing popular products instead.')
+                recommendations = popular()
         else:
             flash('Invalid algorithm selected!')
             return redirect(url_for('index'))
 
         # LỌC bỏ sản phẩm user đã xem/mua (không gợi lại)
-        recommended_products = recommendations[~recommendations['product_id'].isin(purchased_product_ids) &
-                                               ~recommendations['product_id'].isin(browsed_product_ids)].copy()
-        logger.debug(f"Filtered recommendations:\n{recommended_products[['product_id', 'score', 'source']]}")
+        with timed('filtering', 'web'):
+            if product_filter is not None:
+                # kết quả tính sẵn và session-based chưa qua bộ lọc; với các thuật toán khác không đổi gì
+                recommendations = recommendations[recommendations['product_id'].isin(
+                    products.loc[product_filter, 'product_id'])]
+            recommended_products = recommendations[~recommendations['product_id'].isin(purchased_product_ids) &
+                                                   ~recommendations['product_id'].isin(browsed_product_ids)].copy()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Filtered recommendations:\n%s", recommended_products[['product_id', 'score', 'source']])
 
         # nếu không còn sản phẩm phù hợp -> thông báo
         if recommended_products.empty:
@@ -106,13 +239,18 @@ def get_recommendations():
                                recommended_products=recommended_products.to_dict(orient='records'))
     except Exception as e:
         # bắt lỗi chung: log + flash + redirect về index
-        logger.error(f"Error in get_recommendations: {str(e)}")
+        logger.error("Error in get_recommendations: %s", e)
         flash(f'An error occurred: {str(e)}')
         return redirect(url_for('index'))
 
+# ------------------ ROUTE: /metrics ------------------
+@app.route('/metrics')
+def metrics():
+    # thời gian theo từng stage + bộ đếm, định dạng text của Prometheus
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 # ------------------ RUN (Cuối file) ------------------
 if __name__ == '__main__':
-    import os
     port = int(os.environ.get("PORT", 5000))
     # debug=True cho dev (auto reload). Production nên dùng Gunicorn/uWSGI.
     app.run(host='0.0.0.0', port=port, debug=True)
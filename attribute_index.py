@@ -0,0 +1,166 @@
+# ------------------------------------------------------------
+# Chỉ mục bitmap theo thuộc tính sản phẩm (category, price, rating) cho gợi ý có ràng buộc,
+# vd: "hybrid, giá dưới 50, thuộc các category này, rating >= 4".
+#   - Mỗi giá trị category có một bitmap (1 bit / sản phẩm, đóng gói thành mảng uint64).
+#   - price, rating được chia bucket; lưu bitmap tích lũy (các bucket < i). Truy vấn khoảng
+#     = phép AND/ANDNOT trên bitmap tích lũy, chỉ (tối đa) hai bucket ở biên mới phải so
+#     giá trị thật.
+#   - Bộ lọc (filter spec) là dict, vd:
+#       {'categories': ['T_Shirt', 'Jeans'], 'max_price': 50, 'min_rating': 4}
+#     mask(spec) trả về mảng bool theo thứ tự dòng của products; các hàm gợi ý nhận mask này
+#     (tham số product_filter) và chỉ tính điểm cho sản phẩm thỏa điều kiện.
+# Cách dùng:
+#   index = ProductAttributeIndex(products)
+#   mask = index.mask({'max_price': 50, 'min_rating': 4})
+#   hybrid_recommendation(user_id, purchases, browsing_history, products, product_filter=mask)
+# ------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+FILTER_KEYS = ('categories', 'min_price', 'max_price', 'min_rating', 'max_rating')
+
+# ranh giới bucket mặc định của rating (thang 1-5)
+RATING_EDGES = (1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5)
+
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    """Mảng bool -> bitmap uint64 (bit i của word i // 64 ứng với dòng i)."""
+    words = (len(mask) + 63) // 64
+    packed = np.zeros(words * 8, dtype=np.uint8)
+    bits = np.packbits(mask, bitorder='little')
+    packed[:len(bits)] = bits
+    return packed.view(np.uint64)
+
+
+def _unpack(bitmap: np.ndarray, size: int) -> np.ndarray:
+    return np.unpackbits(bitmap.view(np.uint8), bitorder='little', count=size).astype(bool)
+
+
+def validate_spec(spec: dict) -> dict:
+    """Kiểm tra khóa của filter spec; bỏ các giá trị None/rỗng."""
+    unknown = set(spec) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {sorted(unknown)}")
+    return {key: value for key, value in spec.items() if value is not None and not (
+        key == 'categories' and len(value) == 0)}
+
+
+def filter_mask(products: pd.DataFrame, spec: dict) -> np.ndarray:
+    """Cách tính trực tiếp bằng pandas (không cần chỉ mục); cùng kết quả với ProductAttributeIndex.mask."""
+    spec = validate_spec(spec)
+    mask = np.ones(len(products), dtype=bool)
+    if 'categories' in spec:
+        mask &= products['category'].isin(spec['categories']).to_numpy()
+    for key, column, compare in (('min_price', 'price', np.greater_equal), ('max_price', 'price', np.less_equal),
+                                 ('min_rating', 'rating', np.greater_equal),
+                                 ('max_rating', 'rating', np.less_equal)):
+        if key in spec:
+            mask &= compare(products[column].to_numpy(dtype=float), float(spec[key]))
+    return mask
+
+
+class _RangeBitmaps:
+    """Bitmap theo bucket của một cột số, trả lời truy vấn lo <= x <= hi."""
+
+    def __init__(self, values: np.ndarray, edges):
+        self.values = values
+        self.edges = np.asarray(sorted(set(edges)), dtype=float)
+        valid = ~np.isnan(values)
+        # bucket i chứa edges[i-1] <= x < edges[i]; NaN không thuộc bucket nào
+        self.bucket = np.searchsorted(self.edges, values, side='right')
+        num_buckets = len(self.edges) + 1
+        self.rows = [np.flatnonzero(valid & (self.bucket == b)) for b in range(num_buckets)]
+        # cumulative[i] = OR các bucket 0..i-1 (cumulative[0] rỗng)
+        cumulative = [np.zeros((len(values) + 63) // 64, dtype=np.uint64)]
+        for b in range(num_buckets):
+            mask = np.zeros(len(values), dtype=bool)
+            mask[self.rows[b]] = True
+            cumulative.append(cumulative[-1] | _pack(mask))
+        self.cumulative = cumulative
+
+    def query(self, lo=None, hi=None) -> np.ndarray:
+        # các bucket nằm trọn trong khoảng là [first, last); bucket ở biên (nếu có) phải so giá trị thật
+        edge_buckets = set()
+        if lo is None:
+            first = 0
+        else:
+            b = int(np.searchsorted(self.edges, lo, side='right'))
+            if b > 0 and self.edges[b - 1] == lo:
+                # lo trùng ranh giới: cả bucket b đều >= lo
+                first = b
+            else:
+                first = b + 1
+                edge_buckets.add(b)
+        if hi is None:
+            last = len(self.rows)
+        else:
+            last = int(np.searchsorted(self.edges, hi, side='right'))
+            edge_buckets.add(last)
+        result = self.cumulative[last] & ~self.cumulative[first] if last > first else \
+            np.zeros_like(self.cumulative[0])
+        for b in edge_buckets:
+            rows = self.rows[b]
+            keep = np.ones(len(rows), dtype=bool)
+            if lo is not None:
+                keep &= self.values[rows] >= lo
+            if hi is not None:
+                keep &= self.values[rows] <= hi
+            rows = rows[keep]
+            # bật bit của các dòng biên trực tiếp trên bitmap (không tạo mảng bool cỡ cả catalog)
+            np.bitwise_or.at(result, rows >> 6, np.left_shift(np.uint64(1), (rows & 63).astype(np.uint64)))
+        return result
+
+
+class ProductAttributeIndex:
+    """
+    Bitmap của category và bitmap theo bucket của price/rating, dựng một lần cho mỗi bảng products.
+    - price_edges: ranh giới bucket giá; mặc định là các phân vị 1/16 của cột price
+    - rating_edges: ranh giới bucket rating
+    """
+
+    def __init__(self, products: pd.DataFrame, price_edges=None, rating_edges=RATING_EDGES):
+        self.num_products = len(products)
+        self._all = _pack(np.ones(self.num_products, dtype=bool))
+        self.categories = {}
+        if 'category' in products.columns:
+            codes, uniques = pd.factorize(products['category'])
+            for code, value in enumerate(uniques):
+                self.categories[value] = _pack(codes == code)
+        self.ranges = {}
+        for column, edges in (('price', price_edges), ('rating', rating_edges)):
+            if column not in products.columns:
+                continue
+            values = products[column].to_numpy(dtype=float)
+            if edges is None:
+                valid = values[~np.isnan(values)]
+                edges = np.unique(np.quantile(valid, np.linspace(0, 1, 17)[1:-1])) if len(valid) else []
+            self.ranges[column] = _RangeBitmaps(values, edges)
+
+    def bitmap(self, spec: dict) -> np.ndarray:
+        """AND các điều kiện của spec; trả về bitmap đóng gói (uint64)."""
+        spec = validate_spec(spec)
+        result = self._all.copy()
+        if 'categories' in spec:
+            chosen = np.zeros_like(result)
+            for value in spec['categories']:
+                if value in self.categories:
+                    chosen |= self.categories[value]
+            result &= chosen
+        for column in ('price', 'rating'):
+            lo, hi = spec.get(f'min_{column}'), spec.get(f'max_{column}')
+            if lo is None and hi is None:
+                continue
+            if column not in self.ranges:
+                raise ValueError(f"Products have no '{column}' column to filter on")
+            result &= self.ranges[column].query(None if lo is None else float(lo),
+                                                None if hi is None else float(hi))
+        return result
+
+    def mask(self, spec: dict) -> np.ndarray:
+        """Mảng bool theo thứ tự dòng của products: True nếu sản phẩm thỏa spec."""
+        return _unpack(self.bitmap(spec), self.num_products)
+
+    def count(self, spec: dict) -> int:
+        """Số sản phẩm thỏa spec (đếm bit, không giải nén)."""
+        return int(np.unpackbits(self.bitmap(spec).view(np.uint8)).sum())
@@ -0,0 +1,204 @@
+# ------------------------------------------------------------
+# Chấm điểm multi-modal offline cho TOÀN BỘ user, chia nhiều process.
+#   - Phần phía sản phẩm của MultiModalModel (ID, ảnh, mô tả) chỉ được tính MỘT lần
+#     (MultiModalModel.item_representations), rồi đặt vào shared memory cùng bảng
+#     embedding user. Điểm của user u = U[u] @ item_vectors.T + item_bias, đúng bằng
+#     forward(...).mean(dim=1) mà web đang dùng.
+#   - User được chia thành các shard, mỗi worker gắn với một nhóm core
+#     (os.sched_setaffinity) và đặt torch.set_num_threads bằng số core đó.
+#   - Top-K của từng shard được ghép lại thành một bảng kết quả.
+# Cách chạy:
+#   python batch_scoring.py --workers 4 --top-k 20 --db recommendations.sqlite
+# ------------------------------------------------------------
+
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from shared_data import attach_shared_array, create_shared_array
+
+logger = logging.getLogger(__name__)
+
+# trạng thái của từng worker, dựng một lần trong _init_worker
+_worker = {}
+
+
+def compute_item_matrix(model, products: pd.DataFrame, product_images: pd.DataFrame = None):
+    """Tính (item_vectors [N, D], item_bias [N]) cho cả catalog, dạng numpy float32."""
+    import torch
+
+    product_ids = torch.arange(len(products), dtype=torch.long)
+    texts = products['description'].astype(object).fillna("").tolist()
+    with torch.no_grad():
+        item_vectors, item_bias = model.item_representations(product_ids, texts, product_images,
+                                                             image_keys=products['product_id'].tolist())
+    return (item_vectors.cpu().numpy().astype(np.float32),
+            item_bias.cpu().numpy().astype(np.float32))
+
+
+def interacted_csr(user_ids, products: pd.DataFrame, purchases: pd.DataFrame,
+                   browsing_history: pd.DataFrame):
+    """
+    Sản phẩm mỗi user đã mua/đã xem, dạng CSR (indptr, indices) theo thứ tự `user_ids`;
+    indices là vị trí dòng trong `products` (cùng chỉ số với item_vectors).
+    """
+    seen = pd.concat([purchases[['user_id', 'product_id']], browsing_history[['user_id', 'product_id']]])
+    positions = pd.Index(products['product_id'].astype(str)).get_indexer(seen['product_id'].astype(str))
+    rows = pd.Index(user_ids).get_indexer(seen['user_id'])
+    keep = (positions >= 0) & (rows >= 0)
+    pairs = np.unique(np.stack([rows[keep], positions[keep]], axis=1), axis=0)
+    indptr = np.searchsorted(pairs[:, 0], np.arange(len(user_ids) + 1)).astype(np.int64)
+    return indptr, pairs[:, 1].astype(np.int64)
+
+
+def core_groups(workers: int) -> list:
+    """Chia các core mà process được phép dùng thành `workers` nhóm (gần) đều nhau."""
+    if hasattr(os, 'sched_getaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    workers = max(1, min(workers, len(cores)))
+    return [group.tolist() for group in np.array_split(np.array(cores), workers)]
+
+
+def _init_worker(specs: dict, core_queue, k: int, batch_size: int, forked: bool):
+    import torch
+
+    cores = core_queue.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+
+    blocks = {}
+    for key, spec in specs.items():
+        shm, array = attach_shared_array(spec, writeable=True, forked=forked)
+        blocks[key] = shm
+        _worker[key] = torch.from_numpy(array)
+    _worker['blocks'] = blocks
+    _worker['k'] = k
+    _worker['batch_size'] = batch_size
+
+
+def _score_shard(bounds):
+    import torch
+
+    start, stop = bounds
+    user_rows, item_vectors, item_bias = _worker['user_rows'], _worker['item_vectors'], _worker['item_bias']
+    user_emb, indptr, indices = _worker['user_emb'], _worker['indptr'], _worker['indices']
+    k = min(_worker['k'], item_vectors.shape[0])
+    top_idx = np.empty((stop - start, k), dtype=np.int64)
+    top_scores = np.empty((stop - start, k), dtype=np.float32)
+    with torch.no_grad():
+        for lo in range(start, stop, _worker['batch_size']):
+            hi = min(lo + _worker['batch_size'], stop)
+            scores = user_emb[user_rows[lo:hi]] @ item_vectors.T + item_bias
+            # bỏ sản phẩm user đã mua/đã xem (giống bước lọc của web)
+            counts = indptr[lo + 1:hi + 1] - indptr[lo:hi]
+            rows = torch.repeat_interleave(torch.arange(hi - lo), counts)
+            scores[rows, indices[indptr[lo]:indptr[hi]]] = float('-inf')
+            values, idx = torch.topk(scores, k, dim=1)
+            top_idx[lo - start:hi - start] = idx.numpy()
+            top_scores[lo - start:hi - start] = values.numpy()
+    return start, top_idx, top_scores
+
+
+def score_all_users(model, users: pd.DataFrame, products: pd.DataFrame, purchases: pd.DataFrame,
+                    browsing_history: pd.DataFrame, product_images: pd.DataFrame = None,
+                    k: int = 20, workers: int = None, batch_size: int = 256,
+                    shards_per_worker: int = 4) -> pd.DataFrame:
+    """
+    Top-K multi-modal cho mọi user trong `users`.
+    Trả về DataFrame (user_id, rank, product_id, score) sắp theo user_id, rank.
+    """
+    start_time = time.perf_counter()
+    item_vectors, item_bias = compute_item_matrix(model, products, product_images)
+    logger.info("Item matrix %s computed in %.1fs", item_vectors.shape, time.perf_counter() - start_time)
+
+    user_ids = users['user_id'].dropna().astype(int).unique()
+    # chỉ số embedding = user_id - 1, giống web
+    user_rows = (user_ids - 1).astype(np.int64)
+    indptr, indices = interacted_csr(user_ids, products, purchases, browsing_history)
+    arrays = {
+        'item_vectors': item_vectors,
+        'item_bias': item_bias,
+        'user_emb': model.user_emb.weight.detach().cpu().numpy().astype(np.float32),
+        'user_rows': user_rows,
+        'indptr': indptr,
+        'indices': indices,
+    }
+
+    groups = core_groups(workers or os.cpu_count() or 1)
+    num_shards = max(1, len(groups) * shards_per_worker)
+    edges = np.linspace(0, len(user_ids), num_shards + 1).astype(int)
+    shards = [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    blocks, specs = [], {}
+    try:
+        for key, array in arrays.items():
+            shm, specs[key] = create_shared_array(array)
+            blocks.append(shm)
+        # fork (Linux/macOS): worker dùng chung resource_tracker với process cha (xem attach_shared_array)
+        forked = 'fork' in mp.get_all_start_methods()
+        ctx = mp.get_context('fork' if forked else 'spawn')
+        core_queue = ctx.Queue()
+        for group in groups:
+            core_queue.put(group)
+        with ProcessPoolExecutor(max_workers=len(groups), mp_context=ctx, initializer=_init_worker,
+                                 initargs=(specs, core_queue, k, batch_size, forked)) as pool:
+            results = sorted(pool.map(_score_shard, shards), key=lambda r: r[0])
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    # ghép top-K của các shard theo thứ tự user
+    top_idx = np.concatenate([r[1] for r in results])
+    top_scores = np.concatenate([r[2] for r in results])
+    k_eff = top_idx.shape[1]
+    result = pd.DataFrame({
+        'user_id': np.repeat(user_ids, k_eff),
+        'rank': np.tile(np.arange(k_eff), len(user_ids)),
+        'product_id': products['product_id'].to_numpy()[top_idx.ravel()],
+        'score': top_scores.ravel(),
+    })
+    # user đã tương tác gần hết catalog có thể còn ô -inf
+    result = result[np.isfinite(result['score'])].reset_index(drop=True)
+    logger.info("Scored %d users x %d products with %d workers in %.1fs", len(user_ids),
+                len(products), len(groups), time.perf_counter() - start_time)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Chấm điểm multi-modal cho toàn bộ user (nhiều process)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--with-images', action='store_true', help='nạp ảnh sản phẩm khi tính item matrix')
+    parser.add_argument('--db', default=None, help='ghi kết quả vào RecommendationStore (SQLite)')
+    parser.add_argument('--out', default=None, help='ghi kết quả ra CSV')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from model import MultiModalModel
+    from shared_data import load_csv_frames
+
+    frames = load_csv_frames('.')
+    model = MultiModalModel(frames['users']['user_id'].nunique(), frames['products']['product_id'].nunique())
+    model.eval()
+    result = score_all_users(model, frames['users'], frames['products'], frames['purchases'],
+                             frames['browsing_history'],
+                             frames['product_images'] if args.with_images else None,
+                             k=args.top_k, workers=args.workers, batch_size=args.batch_size)
+    if args.out:
+        result.to_csv(args.out, index=False)
+    if args.db:
+        from recommendation_store import RecommendationStore
+        rows_by_user = {uid: list(zip(group['product_id'], group['score'], ['Multi-Modal'] * len(group)))
+                        for uid, group in result.groupby('user_id', sort=False)}
+        RecommendationStore(args.db).write_generation('multi-modal', args.top_k, rows_by_user)
@@ -0,0 +1,208 @@
+# ------------------------------------------------------------
+# Benchmark các thuật toán gợi ý trên dữ liệu giả lập (synthetic_data.py) hoặc CSV thật.
+# Đo cho từng thuật toán: độ trễ p50/p95/p99 (ms), throughput (lượt gọi/giây),
+# bộ nhớ đỉnh cấp phát trong một lượt gọi (tracemalloc, MB).
+# Kết quả ghi ra JSON để so sánh hồi quy giữa các lần chạy.
+# Cách chạy:
+#   python benchmark.py --scale 10 --sample 200 --out bench_x10.json
+#   python benchmark.py --data-dir . --algorithms collaborative hybrid
+#   python benchmark.py --scale 10 --baseline bench_x10.json   # báo các chỉ số chậm đi
+# ------------------------------------------------------------
+
+import argparse
+import json
+import logging
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ('collaborative', 'collaborative-lsh', 'collaborative-decay', 'content-based', 'hybrid', 'session-based',
+              'multi-modal', 'two-stage')
+
+
+def make_recommender(algorithm: str, frames: dict, with_images: bool = False, num_candidates: int = 100,
+                     model=None):
+    """
+    Trả về hàm f(user_id) chạy thuật toán tương ứng trên `frames`.
+    multi-modal/two-stage dùng `model` nếu được truyền, nếu không thì khởi tạo model mới.
+    """
+    from recommenders import collaborative_filtering, content_based_filtering, hybrid_recommendation
+
+    products = frames['products']
+    purchases, browsing_history = frames['purchases'], frames['browsing_history']
+    if algorithm == 'collaborative':
+        return lambda uid: collaborative_filtering(uid, purchases, products)
+    if algorithm == 'collaborative-lsh':
+        from user_index import UserNeighborIndex
+        # láng giềng top-50 từ chỉ mục MinHash/LSH, dựng một lần giống snapshot của web
+        index = UserNeighborIndex.build(purchases, browsing_history)
+        return lambda uid: collaborative_filtering(uid, purchases, products, index, 50)
+    if algorithm == 'collaborative-decay':
+        from aggregates import InteractionAggregates
+        # lượt mua giảm dần theo thời gian, bảng tổng hợp dựng một lần giống snapshot của web
+        aggregates = InteractionAggregates.build(purchases)
+        return lambda uid: collaborative_filtering(uid, purchases, products, aggregates=aggregates)
+    if algorithm == 'content-based':
+        return lambda uid: content_based_filtering(uid, purchases, browsing_history, products)
+    if algorithm == 'hybrid':
+        return lambda uid: hybrid_recommendation(uid, purchases, browsing_history, products)
+    if algorithm == 'session-based':
+        from session_recommender import SessionIndex, session_based_recommendation
+        # dựng bảng chuyển tiếp một lần, giống snapshot của web
+        index = SessionIndex.build(browsing_history)
+        return lambda uid: session_based_recommendation(uid, index, products)
+    if algorithm in ('multi-modal', 'two-stage'):
+        from model import multi_modal_recommendation
+        # khởi tạo model không tính vào thời gian mỗi lượt gọi
+        if model is None:
+            model = new_model(frames)
+        images = frames['product_images'] if with_images else None
+        if algorithm == 'two-stage':
+            from two_stage import two_stage_recommendation
+            # đếm lượt mua một lần, giống popular_counts của snapshot
+            popular_counts = purchases['product_id'].value_counts()
+            return lambda uid: two_stage_recommendation(uid, model, purchases, browsing_history, products,
+                                                        images, num_candidates, popular_counts=popular_counts)
+        return lambda uid: multi_modal_recommendation(uid, model, products, images)
+    raise ValueError(f"Unknown algorithm: {algorithm}")
+
+
+def new_model(frames: dict):
+    """MultiModalModel (chế độ eval) với kích thước embedding theo users/products của `frames`."""
+    from model import MultiModalModel
+
+    model = MultiModalModel(frames['users']['user_id'].nunique(), frames['products']['product_id'].nunique())
+    model.eval()
+    return model
+
+
+def measure(fn, user_ids, memory_sample: int = 10) -> dict:
+    """
+    Gọi fn(user_id) cho từng user, trả về thống kê độ trễ, throughput và bộ nhớ đỉnh.
+    Bộ nhớ được đo ở một lượt riêng (tracemalloc làm chậm code) trên `memory_sample` user đầu.
+    """
+    latencies = np.empty(len(user_ids))
+    start = time.perf_counter()
+    for i, uid in enumerate(user_ids):
+        t0 = time.perf_counter()
+        fn(uid)
+        latencies[i] = time.perf_counter() - t0
+    wall = time.perf_counter() - start
+
+    peak = 0
+    for uid in user_ids[:memory_sample]:
+        tracemalloc.start()
+        fn(uid)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    latencies_ms = latencies * 1000
+    return {
+        'calls': len(user_ids),
+        'mean_ms': float(latencies_ms.mean()),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'throughput_per_s': len(user_ids) / wall if wall > 0 else float('inf'),
+        'peak_mem_mb': peak / 1e6,
+    }
+
+
+def run_benchmarks(frames: dict, algorithms=ALGORITHMS, sample: int = 100, seed: int = 0,
+                   with_images: bool = False, warmup: int = 3, num_candidates: int = 100) -> dict:
+    """Chạy benchmark cho các thuật toán trên cùng một mẫu user; trả về dict kết quả (dạng JSON)."""
+    rng = np.random.default_rng(seed)
+    all_users = frames['users']['user_id'].to_numpy()
+    user_ids = rng.choice(all_users, size=min(sample, len(all_users)), replace=False).tolist()
+
+    results = {}
+    for algorithm in algorithms:
+        try:
+            fn = make_recommender(algorithm, frames, with_images, num_candidates)
+        except ImportError as e:
+            # multi-modal/two-stage cần torch/torchvision/sentence-transformers; thiếu thì bỏ qua
+            logger.warning("Skipping %s: %s", algorithm, e)
+            continue
+        for uid in user_ids[:warmup]:
+            fn(uid)
+        results[algorithm] = measure(fn, user_ids)
+        logger.info("%s: %s", algorithm, results[algorithm])
+
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'sample_users': len(user_ids),
+            'seed': seed,
+            'num_candidates': num_candidates,
+            'sizes': {key: len(df) for key, df in frames.items()},
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.10) -> list:
+    """
+    So sánh với kết quả cũ; trả về danh sách (thuật toán, chỉ số, cũ, mới) bị xấu đi quá `tolerance`.
+    Độ trễ/bộ nhớ tăng hoặc throughput giảm đều tính là xấu đi.
+    """
+    regressions = []
+    for algorithm, metrics in current['results'].items():
+        old = baseline.get('results', {}).get(algorithm)
+        if old is None:
+            continue
+        for key, value in metrics.items():
+            if key == 'calls' or key not in old or not old[key]:
+                continue
+            ratio = value / old[key]
+            worse = ratio < 1 - tolerance if key == 'throughput_per_s' else ratio > 1 + tolerance
+            if worse:
+                regressions.append((algorithm, key, old[key], value))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark các thuật toán gợi ý')
+    parser.add_argument('--scale', type=float, default=1.0, help='quy mô dữ liệu giả lập')
+    parser.add_argument('--alpha', type=float, default=1.1, help='số mũ Zipf của độ phổ biến sản phẩm')
+    parser.add_argument('--data-dir', default=None, help='dùng CSV trong thư mục này thay vì dữ liệu giả lập')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS, default=list(ALGORITHMS))
+    parser.add_argument('--sample', type=int, default=100, help='số user được đo')
+    parser.add_argument('--with-images', action='store_true', help='multi-modal: nạp ảnh sản phẩm')
+    parser.add_argument('--num-candidates', type=int, default=100, help='two-stage: số ứng viên mỗi nguồn')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help='file JSON kết quả cũ để so sánh')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.data_dir:
+        from shared_data import load_csv_frames
+        frames = load_csv_frames(args.data_dir)
+    else:
+        from synthetic_data import generate
+        frames = generate(args.scale, popularity_alpha=args.alpha, seed=args.seed)
+
+    report = run_benchmarks(frames, args.algorithms, args.sample, args.seed, args.with_images,
+                            num_candidates=args.num_candidates)
+    report['meta']['scale'] = None if args.data_dir else args.scale
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report['results'], indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for algorithm, key, old, new in regressions:
+            print(f"REGRESSION {algorithm}.{key}: {old:.3f} -> {new:.3f}")
+        raise SystemExit(1 if regressions else 0)
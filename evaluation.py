@@ -0,0 +1,241 @@
+# ------------------------------------------------------------
+# Đánh giá offline chất lượng gợi ý theo hold-out thời gian.
+#   - Chia purchases/browsing_history theo cột timestamp: mọi sự kiện trước mốc
+#     cutoff là dữ liệu "train", lượt MUA sau mốc là đáp án "test".
+#   - Chạy thuật toán trên dữ liệu train cho mọi user có đáp án, chia user cho
+#     nhiều process (ProcessPoolExecutor).
+#   - Tính recall@K, precision@K, NDCG@K và coverage bằng phép toán mảng numpy
+#     trên ma trận user x K, kèm thời gian chạy của từng thuật toán.
+#   - User mà thuật toán bị lỗi được đếm riêng (failed_users, failure_rate, first_error) và
+#     không tính vào chỉ số; tỉ lệ lỗi vượt --max-failure-rate thì kết quả bị đánh dấu
+#     'failed' và lệnh thoát với mã 1 (thuật toán hỏng không hiện ra như recall 0).
+#   - multi-modal/two-stage: model được khởi tạo MỘT lần ở process cha; worker fork thừa hưởng
+#     chính model đó (copy-on-write), worker spawn nhận state_dict -> mọi shard được chấm bởi
+#     cùng một model.
+# Cách chạy:
+#   python evaluation.py --k 10 --test-fraction 0.2 --workers 4
+#   python evaluation.py --scale 10 --algorithms collaborative hybrid
+# ------------------------------------------------------------
+
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# trạng thái của từng worker, dựng một lần trong _init_worker
+_worker = {}
+
+# thuật toán cần MultiModalModel
+NEURAL_ALGORITHMS = ('multi-modal', 'two-stage')
+
+
+def temporal_split(frames: dict, test_fraction: float = 0.2):
+    """
+    Chia dữ liệu theo thời gian. Mốc cutoff là phân vị (1 - test_fraction) của timestamp lượt mua.
+    Trả về (train_frames, test) với test là DataFrame (user_id, product_id) các lượt mua sau cutoff
+    của sản phẩm user chưa từng tương tác trong train.
+    """
+    purchases = frames['purchases'].copy()
+    browsing = frames['browsing_history'].copy()
+    purchases['timestamp'] = pd.to_datetime(purchases['timestamp'])
+    browsing['timestamp'] = pd.to_datetime(browsing['timestamp'])
+    cutoff = purchases['timestamp'].quantile(1 - test_fraction)
+
+    train = dict(frames)
+    train['purchases'] = purchases[purchases['timestamp'] < cutoff].reset_index(drop=True)
+    train['browsing_history'] = browsing[browsing['timestamp'] < cutoff].reset_index(drop=True)
+
+    test = purchases.loc[purchases['timestamp'] >= cutoff, ['user_id', 'product_id']].drop_duplicates()
+    # chỉ tính sản phẩm mới với user (giống web: không gợi lại sản phẩm đã mua/đã xem)
+    seen = pd.concat([train['purchases'][['user_id', 'product_id']],
+                      train['browsing_history'][['user_id', 'product_id']]]).drop_duplicates()
+    test = test.merge(seen, on=['user_id', 'product_id'], how='left', indicator=True)
+    test = test[test['_merge'] == 'left_only'].drop(columns='_merge').reset_index(drop=True)
+    logger.info("Cutoff %s: %d train purchases, %d test pairs", cutoff,
+                len(train['purchases']), len(test))
+    return train, test
+
+
+def _init_worker(train: dict, algorithm: str, k: int, model=None):
+    """model: MultiModalModel dùng chung, hoặc state_dict của nó (worker spawn), hoặc None."""
+    from benchmark import make_recommender, new_model
+
+    if isinstance(model, dict):
+        state_dict, model = model, new_model(train)
+        model.load_state_dict(state_dict)
+    seen = pd.concat([train['purchases'][['user_id', 'product_id']],
+                      train['browsing_history'][['user_id', 'product_id']]])
+    _worker['recommend'] = make_recommender(algorithm, train, model=model)
+    _worker['seen'] = seen.groupby('user_id')['product_id'].agg(set).to_dict()
+    _worker['k'] = k
+
+
+def _recommend_chunk(user_ids):
+    """Top-K của từng user; user bị lỗi trả về None kèm thông báo lỗi: [(danh sách | None, lỗi | None)]."""
+    recommend, seen, k = _worker['recommend'], _worker['seen'], _worker['k']
+    results = []
+    for uid in user_ids:
+        try:
+            recs = recommend(uid)
+        except Exception as e:
+            # một user lỗi không làm hỏng cả lượt đánh giá, nhưng được đếm riêng (không tính là "không có gợi ý")
+            logger.debug("Recommender failed for user %s: %s", uid, e)
+            results.append((None, f"{type(e).__name__}: {e}"))
+            continue
+        recs = recs[~recs['product_id'].isin(seen.get(uid, ()))]
+        top = recs.sort_values('score', ascending=False).drop_duplicates('product_id').head(k)
+        results.append(([str(pid) for pid in top['product_id']], None))
+    return results
+
+
+def recommend_all(train: dict, algorithm: str, user_ids, k: int = 10, workers: int = None,
+                  chunk_size: int = 64) -> list:
+    """
+    Top-K của mọi user trong `user_ids`, chia theo chunk cho `workers` process.
+    Trả về list (danh sách product_id | None nếu lỗi, thông báo lỗi | None) theo thứ tự user_ids.
+    """
+    from benchmark import new_model
+
+    workers = workers or os.cpu_count() or 1
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    model = new_model(train) if algorithm in NEURAL_ALGORITHMS else None
+    if workers == 1:
+        _init_worker(train, algorithm, k, model)
+        return [rec for chunk in chunks for rec in _recommend_chunk(chunk)]
+    # fork: initargs không bị pickle, worker dùng chung model của process cha;
+    # spawn: gửi state_dict để worker dựng lại đúng model đó
+    forked = 'fork' in mp.get_all_start_methods()
+    if model is not None and not forked:
+        model = model.state_dict()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('fork' if forked else 'spawn'),
+                             initializer=_init_worker, initargs=(train, algorithm, k, model)) as pool:
+        return [rec for chunk_result in pool.map(_recommend_chunk, chunks) for rec in chunk_result]
+
+
+def ranking_metrics(recommended: list, test: pd.DataFrame, user_ids, k: int, num_products: int) -> dict:
+    """
+    Tính recall@K, precision@K, NDCG@K (trung bình trên user) và coverage của danh mục.
+    recommended[i] là danh sách product_id đã xếp hạng cho user_ids[i].
+    """
+    user_ids = np.asarray(user_ids)
+    num_users = len(user_ids)
+    # mã hóa product_id thành số nguyên để so khớp bằng mảng
+    vocab = pd.Index(pd.unique(np.concatenate([
+        test['product_id'].astype(str).to_numpy(),
+        np.array([pid for recs in recommended for pid in recs], dtype=object),
+    ])))
+    rec_matrix = np.full((num_users, k), -1, dtype=np.int64)
+    for i, recs in enumerate(recommended):
+        if recs:
+            codes = vocab.get_indexer(recs[:k])
+            rec_matrix[i, :len(codes)] = codes
+
+    user_pos = pd.Index(user_ids).get_indexer(test['user_id'])
+    test_codes = vocab.get_indexer(test['product_id'].astype(str))
+    valid = user_pos >= 0
+    test_keys = user_pos[valid] * len(vocab) + test_codes[valid]
+    num_relevant = np.bincount(user_pos[valid], minlength=num_users)
+
+    rec_keys = np.arange(num_users)[:, None] * len(vocab) + rec_matrix
+    hits = np.isin(rec_keys, test_keys) & (rec_matrix >= 0)
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (hits * discounts).sum(axis=1)
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])[np.minimum(num_relevant, k)]
+    has_relevant = num_relevant > 0
+
+    recommended_codes = np.unique(rec_matrix[rec_matrix >= 0])
+    return {
+        'users': int(has_relevant.sum()),
+        f'recall@{k}': float((hits.sum(axis=1)[has_relevant] / num_relevant[has_relevant]).mean()),
+        f'precision@{k}': float((hits.sum(axis=1)[has_relevant] / k).mean()),
+        f'ndcg@{k}': float((dcg[has_relevant] / ideal[has_relevant]).mean()),
+        'coverage': len(recommended_codes) / num_products if num_products else 0.0,
+    }
+
+
+def evaluate(frames: dict, algorithms, k: int = 10, test_fraction: float = 0.2,
+             workers: int = None, max_users: int = None, seed: int = 0, max_failure_rate: float = 0.01) -> dict:
+    """
+    Đánh giá từng thuật toán trên cùng một phép chia; trả về {thuật toán: chỉ số + wall_clock_s}.
+    Chỉ số chỉ tính trên user chạy thành công; failure_rate > max_failure_rate -> 'failed': True.
+    """
+    train, test = temporal_split(frames, test_fraction)
+    user_ids = np.sort(test['user_id'].unique())
+    if max_users and len(user_ids) > max_users:
+        user_ids = np.sort(np.random.default_rng(seed).choice(user_ids, max_users, replace=False))
+        test = test[test['user_id'].isin(user_ids)]
+    user_ids = user_ids.tolist()
+
+    report = {}
+    for algorithm in algorithms:
+        start = time.perf_counter()
+        results = recommend_all(train, algorithm, user_ids, k, workers)
+        wall = time.perf_counter() - start
+        ok = [i for i, (recs, _) in enumerate(results) if recs is not None]
+        errors = [error for recs, error in results if recs is None]
+        ok_users = [user_ids[i] for i in ok]
+        if ok_users:
+            metrics = ranking_metrics([results[i][0] for i in ok], test[test['user_id'].isin(ok_users)],
+                                      ok_users, k, len(frames['products']))
+        else:
+            metrics = {'users': 0}
+        failure_rate = len(errors) / len(user_ids) if user_ids else 0.0
+        metrics.update({
+            'wall_clock_s': wall,
+            'failed_users': len(errors),
+            'failure_rate': failure_rate,
+            'failed': failure_rate > max_failure_rate,
+        })
+        if errors:
+            metrics['first_error'] = errors[0]
+        report[algorithm] = metrics
+        if metrics['failed']:
+            logger.error("%s failed for %d/%d users (%s)", algorithm, len(errors), len(user_ids), errors[0])
+        logger.info("%s: %s", algorithm, report[algorithm])
+    return report
+
+
+if __name__ == '__main__':
+    from benchmark import ALGORITHMS
+
+    parser = argparse.ArgumentParser(description='Đánh giá offline (recall@K, NDCG) theo hold-out thời gian')
+    parser.add_argument('--data-dir', default='.', help='thư mục chứa các CSV')
+    parser.add_argument('--scale', type=float, default=None, help='dùng dữ liệu giả lập ở quy mô này')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS,
+                        default=['collaborative', 'content-based', 'hybrid'])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--test-fraction', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-users', type=int, default=None)
+    parser.add_argument('--max-failure-rate', type=float, default=0.01,
+                        help='tỉ lệ user bị lỗi tối đa trước khi coi thuật toán là hỏng')
+    parser.add_argument('--out', default=None, help='ghi kết quả ra file JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.scale:
+        from synthetic_data import generate
+        frames = generate(args.scale)
+    else:
+        from shared_data import load_csv_frames
+        frames = load_csv_frames(args.data_dir)
+
+    report = evaluate(frames, args.algorithms, args.k, args.test_fraction, args.workers, args.max_users,
+                      max_failure_rate=args.max_failure_rate)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    failed = [algorithm for algorithm, result in report.items() if result['failed']]
+    if failed:
+        print(f"FAILED: {', '.join(failed)}")
+        raise SystemExit(1)
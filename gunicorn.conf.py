@@ -0,0 +1,37 @@
+# ------------------------------------------------------------
+# Cấu hình Gunicorn cho chế độ nhiều worker dùng chung dữ liệu.
+# Cách chạy:
+#   RECSYS_SHARED_DATA=1 gunicorn -c gunicorn.conf.py "app(2):app"
+# preload_app=True: app(2).py (CSV + MultiModalModel) được import MỘT lần ở process cha
+# trước khi fork, các worker thừa hưởng bộ nhớ đó thay vì tự nạp lại.
+# Các khối shared memory được process cha xóa khi thoát (atexit trong shared_data.prefork_load).
+# /metrics: mỗi worker có bộ đếm riêng; post_fork bật chế độ nhiều process của metrics.py để mỗi
+# worker ghi số liệu ra RECSYS_METRICS_DIR và /metrics trả về tổng của mọi worker.
+# ------------------------------------------------------------
+
+import glob
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+preload_app = True
+# đặt RECSYS_SHM_MANIFEST để process khác (vd: job offline) attach vào cùng dữ liệu
+raw_env = [
+    'RECSYS_SHARED_DATA=1',
+    f"RECSYS_SHM_MANIFEST={os.environ.get('RECSYS_SHM_MANIFEST', 'recsys_shm.json')}",
+]
+
+
+# thư mục số liệu của các worker (xem metrics.enable_multiprocess)
+metrics_dir = os.environ.get('RECSYS_METRICS_DIR', 'recsys_metrics')
+
+
+def on_starting(server):
+    # server mới: bỏ số liệu của lần chạy trước
+    for path in glob.glob(os.path.join(metrics_dir, 'metrics-*.json')):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    from metrics import enable_multiprocess
+    enable_multiprocess(metrics_dir)
@@ -0,0 +1,100 @@
+# ------------------------------------------------------------
+# Đo thời gian import và bộ nhớ (RSS) của các module gợi ý, mỗi lần đo trong một
+# process Python mới (không bị ảnh hưởng bởi module đã nạp sẵn).
+#   recommenders           : chỉ các thuật toán cổ điển (pandas)
+#   model                  : điểm import chung, MultiModalModel chưa được nạp
+#   model.MultiModalModel  : truy cập MultiModalModel -> nạp toàn bộ stack neural
+#   two_stage              : gợi ý 2 giai đoạn, torch chỉ được nạp khi xếp hạng lại
+# Process con chạy trong thư mục chứa file này nên lệnh chạy được từ thư mục bất kỳ.
+# Kết quả (trung vị qua --repeat lần) ghi ra JSON để so sánh giữa các máy / phiên bản.
+# Cách chạy:
+#   python import_profile.py --repeat 5 --out import_profile.json
+# ------------------------------------------------------------
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+TARGETS = ('recommenders', 'model', 'model.MultiModalModel', 'two_stage')
+# thư mục chứa các module cần đo
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# đoạn code chạy trong process con: đo RSS trước/sau và thời gian import
+_PROBE = r'''
+import importlib, json, sys, time
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    # ru_maxrss: KB trên Linux, byte trên macOS
+    scale = 1 / 1024 / 1024 if sys.platform == 'darwin' else 1 / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+target = sys.argv[1]
+module_name, _, attr = target.partition('.')
+rss_before = rss_mb()
+start = time.perf_counter()
+module = importlib.import_module(module_name)
+if attr:
+    getattr(module, attr)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'import_s': elapsed,
+    'rss_before_mb': rss_before,
+    'rss_after_mb': rss_mb(),
+    'torch_loaded': 'torch' in sys.modules,
+    'modules_loaded': len(sys.modules),
+}))
+'''
+
+
+def profile(target: str, repeat: int = 5) -> dict:
+    """Import `target` trong `repeat` process mới; trả về trung vị thời gian và RSS."""
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-c', _PROBE, target], capture_output=True, text=True,
+                              cwd=_REPO_DIR)
+        if proc.returncode != 0:
+            # thiếu thư viện (vd: chưa cài torch_geometric) -> ghi lỗi thay vì số đo
+            return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {
+        'runs': repeat,
+        'import_s': float(np.median([r['import_s'] for r in runs])),
+        'rss_mb': float(np.median([r['rss_after_mb'] for r in runs])),
+        'rss_delta_mb': float(np.median([r['rss_after_mb'] - r['rss_before_mb'] for r in runs])),
+        'torch_loaded': runs[-1]['torch_loaded'],
+        'modules_loaded': runs[-1]['modules_loaded'],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Đo thời gian import và RSS của các module gợi ý')
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--out', default='import_profile.json')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        },
+        'results': {target: profile(target, args.repeat) for target in args.targets},
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report['results'], indent=2))
@@ -0,0 +1,182 @@
+# ------------------------------------------------------------
+# Đo thời gian theo từng giai đoạn (stage) của các hàm gợi ý.
+# Các stage dùng trong repo: history_lookup, candidate_generation, scoring,
+# image_load, text_encode, filtering.
+# Cách dùng:
+#   from metrics import timed, incr
+#   with timed('scoring', 'collaborative'):
+#       ...
+#   incr('fallback', 'hybrid')
+#   observe('image_load', elapsed, 'multi-modal')
+# Flask đọc kết quả qua render_prometheus() tại endpoint /metrics.
+# Nhiều process (gunicorn): mỗi worker có registry riêng. enable_multiprocess(dir) (gọi trong
+# post_fork, xem gunicorn.conf.py) cho mỗi worker ghi số liệu của mình ra dir/metrics-<pid>.json
+# định kỳ; /metrics ở worker nào cũng cộng dồn mọi file => số liệu của cả server (trễ tối đa
+# một chu kỳ ghi với các worker khác). File của worker đã thoát được giữ lại để counter không giảm.
+# ------------------------------------------------------------
+
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ngưỡng (giây) của histogram, đủ rộng cho cả hàm pandas (ms) lẫn model (s)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class StageMetrics:
+    """
+    Bộ đếm nhẹ, an toàn với nhiều thread: histogram thời gian theo (recommender, stage)
+    và bộ đếm sự kiện theo (recommender, name). Chỉ cộng số, không format chuỗi khi ghi.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._dump_lock = threading.Lock()  # thread ghi định kỳ và /metrics cùng ghi một file
+        self._timings = {}   # (recommender, stage) -> [bucket_counts, sum, count]
+        self._counters = {}  # (recommender, name) -> int
+
+    def observe(self, stage: str, seconds: float, recommender: str = ''):
+        key = (recommender, stage)
+        with self._lock:
+            entry = self._timings.get(key)
+            if entry is None:
+                entry = self._timings[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += seconds
+            entry[2] += 1
+
+    def incr(self, name: str, recommender: str = '', value: int = 1):
+        key = (recommender, name)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """Bản sao dữ liệu hiện tại: (timings, counters)."""
+        with self._lock:
+            timings = {k: ([*v[0]], v[1], v[2]) for k, v in self._timings.items()}
+            counters = dict(self._counters)
+        return timings, counters
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def dump(self, path: str):
+        """Ghi snapshot ra file JSON (ghi file tạm rồi đổi tên: người đọc không thấy file dở dang)."""
+        with self._dump_lock:
+            # chụp và ghi trong cùng khóa: snapshot cũ không ghi đè được snapshot mới hơn
+            timings, counters = self.snapshot()
+            data = {
+                'timings': [[recommender, stage, *entry] for (recommender, stage), entry in timings.items()],
+                'counters': [[recommender, name, value] for (recommender, name), value in counters.items()],
+            }
+            tmp = f'{path}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+
+    def render_prometheus(self, data=None) -> str:
+        """Xuất dữ liệu theo định dạng text của Prometheus; data = (timings, counters), mặc định của registry này."""
+        timings, counters = data if data is not None else self.snapshot()
+        lines = [
+            '# HELP recsys_stage_seconds Time spent in each recommender stage.',
+            '# TYPE recsys_stage_seconds histogram',
+        ]
+        for (recommender, stage), (bucket_counts, total, count) in sorted(timings.items()):
+            labels = f'recommender="{recommender}",stage="{stage}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets, bucket_counts):
+                cumulative += n
+                lines.append(f'recsys_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'recsys_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'recsys_stage_seconds_sum{{{labels}}} {total}')
+            lines.append(f'recsys_stage_seconds_count{{{labels}}} {count}')
+        lines += [
+            '# HELP recsys_events_total Count of recommender events.',
+            '# TYPE recsys_events_total counter',
+        ]
+        for (recommender, name), value in sorted(counters.items()):
+            lines.append(f'recsys_events_total{{recommender="{recommender}",event="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# registry dùng chung cho cả process
+registry = StageMetrics()
+
+# thư mục trao đổi số liệu giữa các worker (None = chỉ một process)
+_multiprocess = {'dir': None}
+
+
+def load_merged(directory: str):
+    """Cộng dồn các file metrics-*.json trong directory; trả về (timings, counters) như StageMetrics.snapshot()."""
+    timings, counters = {}, {}
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for recommender, stage, bucket_counts, total, count in data['timings']:
+            entry = timings.setdefault((recommender, stage), ([0] * len(bucket_counts), 0.0, 0))
+            timings[(recommender, stage)] = ([a + b for a, b in zip(entry[0], bucket_counts)],
+                                             entry[1] + total, entry[2] + count)
+        for recommender, name, value in data['counters']:
+            counters[(recommender, name)] = counters.get((recommender, name), 0) + value
+    return timings, counters
+
+
+def enable_multiprocess(directory: str, interval: float = 5.0):
+    """
+    Gọi một lần trong mỗi worker (sau fork). Xóa số liệu thừa hưởng từ process cha, rồi ghi
+    registry ra directory/metrics-<pid>.json mỗi `interval` giây bằng thread nền.
+    """
+    os.makedirs(directory, exist_ok=True)
+    registry.reset()
+    _multiprocess['dir'] = directory
+    path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+
+    def _run():
+        while True:
+            try:
+                registry.dump(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    threading.Thread(target=_run, name='metrics-export', daemon=True).start()
+
+
+@contextmanager
+def timed(stage: str, recommender: str = ''):
+    """Đo thời gian khối lệnh bên trong và ghi vào registry."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(stage, time.perf_counter() - start, recommender)
+
+
+def observe(stage: str, seconds: float, recommender: str = ''):
+    """Ghi trực tiếp một thời lượng đã đo (dùng khi không tiện bọc bằng `with timed(...)`)."""
+    registry.observe(stage, seconds, recommender)
+
+
+def incr(name: str, recommender: str = '', value: int = 1):
+    registry.incr(name, recommender, value)
+
+
+def render_prometheus() -> str:
+    directory = _multiprocess['dir']
+    if directory is None:
+        return registry.render_prometheus()
+    # ghi số liệu mới nhất của worker đang trả lời trước khi cộng dồn
+    registry.dump(os.path.join(directory, f'metrics-{os.getpid()}.json'))
+    return registry.render_prometheus(load_merged(directory))
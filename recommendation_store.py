@@ -0,0 +1,243 @@
+# ------------------------------------------------------------
+# Kho gợi ý tính sẵn (materialized recommendation store).
+# Job offline chạy một thuật toán gợi ý cho TẤT CẢ user trong users_expanded.csv,
+# ghi top-K vào SQLite kèm generation_id. Web chỉ cần tra cứu, không tính model.
+# Cách chạy:
+#   python recommendation_store.py --algorithm hybrid --top-k 20
+#   python recommendation_store.py --algorithm multi-modal --db recommendations.sqlite
+# Lưu ý:
+#   - Mỗi lần chạy tạo một generation mới; chỉ khi ghi xong mới chuyển con trỏ
+#     "active_generation:<thuật toán>" sang generation đó (đọc không bao giờ thấy dữ liệu dở dang).
+#     Mỗi thuật toán có con trỏ riêng: tính sẵn hybrid không làm mất bản collaborative đang phục vụ.
+#   - Mỗi thuật toán giữ lại `keep` generation gần nhất, các generation cũ hơn bị xóa.
+# ------------------------------------------------------------
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ('collaborative', 'content-based', 'hybrid', 'multi-modal')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS generations (
+    generation_id TEXT PRIMARY KEY,
+    algorithm     TEXT NOT NULL,
+    top_k         INTEGER NOT NULL,
+    num_users     INTEGER NOT NULL,
+    created_at    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot_users (
+    generation_id TEXT NOT NULL,
+    user_id       INTEGER NOT NULL,
+    PRIMARY KEY (generation_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS recommendations (
+    generation_id TEXT NOT NULL,
+    user_id       INTEGER NOT NULL,
+    rank          INTEGER NOT NULL,
+    product_id    TEXT NOT NULL,
+    score         REAL NOT NULL,
+    source        TEXT NOT NULL,
+    PRIMARY KEY (generation_id, user_id, rank)
+) WITHOUT ROWID;
+"""
+
+
+class RecommendationStore:
+    """
+    Kho key-value nhúng (SQLite) lưu top-K gợi ý cho từng user.
+    Key = (generation_id, user_id), value = danh sách (product_id, score, source) theo thứ hạng.
+    Mỗi thread dùng một kết nối riêng nên có thể dùng chung trong Flask; kết nối cũng gắn với
+    process đã mở nó: worker gunicorn (fork từ process cha preload_app) tự mở kết nối mới.
+    """
+
+    def __init__(self, path: str = 'recommendations.sqlite'):
+        self.path = path
+        self._local = threading.local()
+        self._inherited = []
+        # tạo schema bằng kết nối tạm rồi đóng ngay: process cha không giữ kết nối mở khi fork
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid != os.getpid():
+            # kết nối thừa hưởng qua fork: không dùng, cũng không đóng (close ở process con có thể
+            # checkpoint/xóa file WAL mà process cha còn dùng) -> chỉ giữ tham chiếu
+            self._inherited.append(conn)
+            conn = None
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            # WAL cho phép đọc song song trong khi job offline đang ghi generation mới
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def active_generation(self, algorithm: str = None):
+        """
+        Trả về generation_id đang được phục vụ của `algorithm` (None nếu chưa có snapshot nào).
+        Không truyền algorithm: generation được ghi gần nhất, của thuật toán bất kỳ.
+        """
+        conn = self._connect()
+        key = 'active_generation' if algorithm is None else f'active_generation:{algorithm}'
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if row is None and algorithm is not None:
+            # kho ghi trước khi có con trỏ theo thuật toán: chỉ có con trỏ chung
+            row = conn.execute(
+                "SELECT m.value FROM meta m JOIN generations g ON g.generation_id = m.value "
+                "WHERE m.key = 'active_generation' AND g.algorithm = ?", (algorithm,)).fetchone()
+        return row[0] if row else None
+
+    def write_generation(self, algorithm: str, top_k: int, rows_by_user: dict, keep: int = 2) -> str:
+        """
+        Ghi một generation mới và kích hoạt nó trong cùng một transaction.
+        rows_by_user: {user_id: [(product_id, score, source), ...]} đã sắp xếp theo score giảm dần.
+        """
+        generation_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO generations VALUES (?, ?, ?, ?, ?)",
+                (generation_id, algorithm, top_k, len(rows_by_user), time.time()))
+            conn.executemany(
+                "INSERT INTO snapshot_users VALUES (?, ?)",
+                ((generation_id, int(uid)) for uid in rows_by_user))
+            conn.executemany(
+                "INSERT INTO recommendations VALUES (?, ?, ?, ?, ?, ?)",
+                ((generation_id, int(uid), rank, str(pid), float(score), source)
+                 for uid, rows in rows_by_user.items()
+                 for rank, (pid, score, source) in enumerate(rows[:top_k])))
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)", (f'active_generation:{algorithm}', generation_id))
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('active_generation', ?)", (generation_id,))
+            # dọn các generation cũ của cùng thuật toán, chỉ giữ lại `keep` bản gần nhất
+            stale = [r[0] for r in conn.execute(
+                "SELECT generation_id FROM generations WHERE algorithm = ? "
+                "ORDER BY created_at DESC LIMIT -1 OFFSET ?", (algorithm, keep))]
+            for old in stale:
+                conn.execute("DELETE FROM recommendations WHERE generation_id = ?", (old,))
+                conn.execute("DELETE FROM snapshot_users WHERE generation_id = ?", (old,))
+                conn.execute("DELETE FROM generations WHERE generation_id = ?", (old,))
+        logger.info("Wrote generation %s (%s) for %d users", generation_id, algorithm, len(rows_by_user))
+        return generation_id
+
+    def lookup(self, user_id: int, algorithm: str = None, generation_id: str = None):
+        """
+        Tra cứu gợi ý của user trong snapshot.
+        Truyền `algorithm`: dùng generation đang phục vụ của thuật toán đó; nếu truyền cả
+        generation_id mà generation đó được tính bằng thuật toán khác thì coi như không có.
+        Trả về DataFrame (product_id, score, source) hoặc None nếu user không có trong snapshot.
+        """
+        conn = self._connect()
+        generation_id = generation_id or self.active_generation(algorithm)
+        if generation_id is None:
+            return None
+        if algorithm is not None:
+            row = conn.execute(
+                "SELECT algorithm FROM generations WHERE generation_id = ?", (generation_id,)).fetchone()
+            if row is None or row[0] != algorithm:
+                return None
+        present = conn.execute(
+            "SELECT 1 FROM snapshot_users WHERE generation_id = ? AND user_id = ?",
+            (generation_id, int(user_id))).fetchone()
+        if present is None:
+            return None
+        rows = conn.execute(
+            "SELECT product_id, score, source FROM recommendations "
+            "WHERE generation_id = ? AND user_id = ? ORDER BY rank",
+            (generation_id, int(user_id))).fetchall()
+        return pd.DataFrame(rows, columns=['product_id', 'score', 'source'])
+
+
+def _exclude_interacted(recommendations: pd.DataFrame, user_id: int,
+                        purchases: pd.DataFrame, browsing_history: pd.DataFrame) -> pd.DataFrame:
+    # giống bước lọc trong web: không gợi lại sản phẩm user đã mua/đã xem
+    seen = set(purchases.loc[purchases['user_id'] == user_id, 'product_id']) | \
+           set(browsing_history.loc[browsing_history['user_id'] == user_id, 'product_id'])
+    return recommendations[~recommendations['product_id'].isin(seen)]
+
+
+def build_store(algorithm: str, users: pd.DataFrame, products: pd.DataFrame,
+                purchases: pd.DataFrame, browsing_history: pd.DataFrame,
+                product_images: pd.DataFrame = None, store: RecommendationStore = None,
+                top_k: int = 20, model=None, workers: int = None) -> str:
+    """
+    Job offline: chạy `algorithm` cho mọi user trong `users` và ghi top-K vào `store`.
+    multi-modal dùng batch_scoring.score_all_users (ma trận sản phẩm tính một lần, `workers` process).
+    Trả về generation_id vừa ghi.
+    """
+    from recommenders import collaborative_filtering, content_based_filtering, hybrid_recommendation
+
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    store = store or RecommendationStore()
+
+    if algorithm == 'multi-modal' and model is None:
+        from model import MultiModalModel
+        model = MultiModalModel(users['user_id'].nunique(), products['product_id'].nunique())
+        model.eval()
+
+    user_ids = users['user_id'].dropna().astype(int).unique()
+    rows_by_user = {}
+    start = time.perf_counter()
+    if algorithm == 'multi-modal':
+        from batch_scoring import score_all_users
+        # đã bỏ sản phẩm user đã mua/đã xem và sắp theo rank; user không còn sản phẩm nào -> danh sách rỗng
+        scored = score_all_users(model, users, products, purchases, browsing_history, product_images,
+                                 k=top_k, workers=workers)
+        rows_by_user = {int(uid): [] for uid in user_ids}
+        for uid, group in scored.groupby('user_id', sort=False):
+            rows_by_user[int(uid)] = list(zip(group['product_id'], group['score'], ['Multi-Modal'] * len(group)))
+    else:
+        for user_id in user_ids:
+            if algorithm == 'collaborative':
+                recs = collaborative_filtering(user_id, purchases, products)
+            elif algorithm == 'content-based':
+                recs = content_based_filtering(user_id, purchases, browsing_history, products)
+            else:
+                recs = hybrid_recommendation(user_id, purchases, browsing_history, products)
+            recs = _exclude_interacted(recs, user_id, purchases, browsing_history)
+            recs = recs.sort_values(by='score', ascending=False).head(top_k)
+            rows_by_user[user_id] = list(zip(recs['product_id'], recs['score'], recs['source']))
+    logger.info("Computed %s for %d users in %.1fs", algorithm, len(rows_by_user), time.perf_counter() - start)
+    return store.write_generation(algorithm, top_k, rows_by_user)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tính sẵn top-K gợi ý cho toàn bộ user')
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='hybrid')
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--db', default='recommendations.sqlite')
+    parser.add_argument('--workers', type=int, default=None, help='số process chấm điểm multi-modal')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    build_store(
+        args.algorithm,
+        users=pd.read_csv('users_expanded.csv'),
+        products=pd.read_csv('products_expanded.csv'),
+        purchases=pd.read_csv('purchases_expanded.csv'),
+        browsing_history=pd.read_csv('browsing_history_expanded.csv'),
+        product_images=pd.read_csv('product_images_expanded.csv'),
+        store=RecommendationStore(args.db),
+        top_k=args.top_k,
+        workers=args.workers,
+    )
@@ -0,0 +1,185 @@
+# ------------------------------------------------------------
+# Các thuật toán gợi ý cổ điển, chỉ cần pandas: collaborative, content-based, hybrid.
+# Module này KHÔNG import torch/torchvision/sentence-transformers, nên các process chỉ
+# chạy các thuật toán này (worker CF, job CLI) khởi động nhanh và tốn ít bộ nhớ.
+# Mô hình đa phương thức nằm ở multimodal.py; model.py gom cả hai cho code cũ.
+# ------------------------------------------------------------
+
+import pandas as pd
+import logging
+from metrics import timed, incr
+# tạo logger riêng cho module; mức log do ứng dụng gọi (app, streamlit) cấu hình qua logging.basicConfig
+logger = logging.getLogger(__name__)
+
+'''Lọc các sản phẩm được phép gợi ý trước khi tính điểm với:
+    - product_filter: None (không lọc), mảng bool theo dòng của products (vd: ProductAttributeIndex.mask)
+      hoặc dict filter spec (xem attribute_index.py), khi đó tính mask trực tiếp bằng pandas'''
+def filter_products(products: pd.DataFrame, product_filter=None) -> pd.DataFrame:
+    if product_filter is None:
+        return products
+    if isinstance(product_filter, dict):
+        from attribute_index import filter_mask
+        product_filter = filter_mask(products, product_filter)
+    if len(product_filter) != len(products):
+        raise ValueError("product_filter mask does not match products")
+    return products[product_filter]
+
+'''Hàm gợi ý dựa trên cộng tác với:
+    - user_id là người dùng đang được gợi ý
+    - purchases là dataframe lịch sử mua sắm của tất cả người dùng
+    - products là dataframe mô tả sản phẩm
+    - neighbor_index (tùy chọn) là UserNeighborIndex (user_index.py): khi có, láng giềng là top_m user
+      giống nhất theo MinHash/LSH thay vì mọi user mua chung ít nhất 1 sản phẩm
+    - product_filter (tùy chọn): chỉ gợi ý sản phẩm thỏa bộ lọc (xem filter_products)
+    - aggregates (tùy chọn) là InteractionAggregates (aggregates.py): khi có, mỗi lượt mua của láng giềng
+      được tính theo trọng số giảm dần theo thời gian thay vì đếm 1'''
+def collaborative_filtering(user_id: int, purchases: pd.DataFrame, products: pd.DataFrame,
+                            neighbor_index=None, top_m: int = 50, product_filter=None,
+                            aggregates=None) -> pd.DataFrame:
+    # ghi trong file lod=g để cho biết hàm đang chạy cho user nào
+    logger.debug("Collaborative Filtering for user_id: %s", user_id)
+    incr('calls', 'collaborative')
+    with timed('history_lookup', 'collaborative'):
+        # lấy cột product id và mà user id = user id đang xét, lấy các product id ko trùng lặp
+        # B1: lấy danh sách sản phẩm của người dùng hiện tại
+        user_purchases = purchases[purchases['user_id'] == user_id]['product_id'].unique()
+    # ghi ra danh sách sản phẩm dưới dạng series
+    logger.debug("User purchases: %s", user_purchases)
+    with timed('candidate_generation', 'collaborative'):
+        # lấy những cột user_id mà product id nằm trong user_purchases và user id khác người dùng hiện tại
+        # B2: tìm những người mua cùng sản phẩm với người dùng đang xét
+        if neighbor_index is not None:
+            # chỉ top_m user tương tự nhất (tra chỉ mục LSH, không quét purchases)
+            other_users, _ = neighbor_index.neighbors(user_id, top_m)
+        else:
+            other_users = purchases[purchases['product_id'].isin(user_purchases) & (purchases['user_id'] != user_id)]['user_id'].unique()
+        if aggregates is not None:
+            # B3+B4: tổng trọng số giảm dần theo thời gian của các sản phẩm láng giềng đã mua (tra bảng tính sẵn)
+            product_counts = aggregates.item_weights(other_users)
+        else:
+            # B3: lấy danh sách sản phẩm của những người dùng khác
+            other_purchases = purchases[purchases['user_id'].isin(other_users)]
+            # B4: đếm số lần xuất hiện của các sản phẩm trong other_purchases
+            product_counts = other_purchases['product_id'].value_counts()
+        # với cột categorical (dữ liệu dùng chung, xem shared_data.py) value_counts trả cả sản phẩm có 0 lượt mua
+        product_counts = product_counts[product_counts > 0]
+        # B5: chọn danh sách sản phẩm gợi ý
+        # lấy những sản phẩm ở trong product count (danh sách mua của người dùng khác) mà ko nằm trong ds mua của người dùng đang xét
+        # (chỉ trong các sản phẩm thỏa bộ lọc, nếu có)
+        allowed = filter_products(products, product_filter)
+        recommendations = allowed[allowed['product_id'].isin(product_counts.index) &
+                                  ~allowed['product_id'].isin(user_purchases)].copy()
+    with timed('scoring', 'collaborative'):
+        # tính điểm
+        # xét các product id trong bảng recommendations, tìm product id giống thế trong product count, gắn giá trị đếm tương ứng
+        # nếu ko tìm thấy thì ghi 0 vào cột mới purchase_count
+        recommendations['purchase_count'] = recommendations['product_id'].map(product_counts).fillna(0)
+        # tính điểm dựa trên số lần xuất hiện * đánh giá
+        recommendations['raw_score'] = recommendations['purchase_count']*recommendations['rating']
+        # chuẩn hóa về thang [0,1] bằng cách chia cho lần xuất hiện nhiều nhất
+        recommendations['score'] = recommendations['raw_score']/product_counts.max()
+        # gắn nhãn nguồn
+        recommendations['source'] = 'Collaborative Filtering'
+        recommendations = recommendations.sort_values(by='score',ascending = False)
+    # ghi lại dataframe recommendations với 3 cột  product_id, score, source vào log
+    # (chỉ cắt/format dataframe khi mức DEBUG đang bật)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Collaborative recommendations: \n%s", recommendations[['product_id', 'score', 'source']])
+    
+    return recommendations
+
+'''Hàm gợi ý dựa trên lịch sử xem với:
+    - user_id: người dùng đang được gợi ý
+    - purchases: dataframe ghi lịch sử mua
+    - browsing_history: dataframe ghi lịch sử xem sản phẩm
+    - products: dataframe mô tả sản phẩm
+    - product_filter (tùy chọn): chỉ gợi ý sản phẩm thỏa bộ lọc (xem filter_products)'''
+def content_based_filtering(user_id: int, purchases: pd.DataFrame, browsing_history: pd.DataFrame, products: pd.DataFrame,
+                            product_filter=None) -> pd.DataFrame:
+    logger.debug("Content-Based Filtering for user_id: %s", user_id)
+    incr('calls', 'content-based')
+    with timed('history_lookup', 'content-based'):
+        # lấy những sản phẩm mà người dùng đang xét đã xem
+        user_history = browsing_history[browsing_history['user_id'] == user_id]['product_id'].unique()
+    # ghi ra danh sách sản phẩm 
+    logger.debug("User browsing history: %s", user_history)
+    # lấy thông tin của những sản phẩm mà người dùng đã xem
+    user_products = products[products['product_id'].isin(user_history)]
+    # nếu như sản phẩn có thông tin và cột category nằm trong dataframe products
+    if not user_products.empty and 'category' in products.columns:
+        with timed('candidate_generation', 'content-based'):
+            # gợi ý những sản phẩm mà có category nằm trong user_products mà không phải là những sản phẩm mà người dùng đã xem
+            # (lịch sử xem vẫn tính trên toàn bộ products, chỉ sản phẩm gợi ý mới bị lọc)
+            allowed = filter_products(products, product_filter)
+            recommendations = allowed[allowed['category'].isin(user_products['category']) &
+                                      ~allowed['product_id'].isin(user_history)].copy()
+        
+        with timed('scoring', 'content-based'):
+            # lấy trung bình rating các sản phẩm mà người dùng đã xem 
+            avg_rating = user_products['rating'].mean()
+            # chuẩn hóa rating về thang [0,1]
+            recommendations['score'] = recommendations['rating']/5.0 * avg_rating
+            recommendations['score'] = recommendations['score'] / recommendations['score'].max()
+    else:
+        # trả về dataframe rỗng chỉ có tên cột
+        recommendations = pd.DataFrame(columns = ['product_id', 'product_name', 'price', 'rating', 'score', 'source'])
+        # ghi lại trong log là không có gợi ý theo nội dung
+        logger.debug("No content-based recommendations.")
+        incr('empty', 'content-based')
+    recommendations['source'] = 'Content-Based Filtering'
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Content-based recommendations:\n%s", recommendations[['product_id', 'score', 'source']])
+    return recommendations
+
+def hybrid_recommendation(user_id, purchases, browsing_history, products, neighbor_index=None, top_m=50,
+                          product_filter=None, aggregates=None):
+    logger.debug("Hybrid Recommendation for user_ id: %s", user_id)
+    incr('calls', 'hybrid')
+    with timed('history_lookup', 'hybrid'):
+        # danh sách sản phẩm mua 
+        user_purchases = purchases[purchases['user_id'] == user_id]['product_id'].unique()
+        # danh sách sản phẩm đã xem
+        user_browsed = browsing_history[browsing_history['user_id'] == user_id]['product_id'].unique()
+        # tổng hợp danh sách đã mua và đã xem
+        user_history = set(user_purchases).union(user_browsed)
+    logger.debug("User history (purchases + browsed): %s", user_history)
+    # lấy danh sách gợi ý của 2 hàm gợi ý (thời gian từng stage được ghi bởi chính 2 hàm này)
+    if isinstance(product_filter, dict):
+        # tính mask một lần cho cả 2 hàm con
+        from attribute_index import filter_mask
+        product_filter = filter_mask(products, product_filter)
+    collab_recs = collaborative_filtering(user_id, purchases, products, neighbor_index, top_m, product_filter,
+                                          aggregates)
+    content_recs = content_based_filtering(user_id, purchases, browsing_history, products, product_filter)
+    with timed('candidate_generation', 'hybrid'):
+        # ghép 2 dataframe lại thành 1 danh sách gợi ý tổng
+        all_recommendations = pd.concat([collab_recs, content_recs], ignore_index=True)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Combined recommendations:\n%s", all_recommendations[['product_id', 'score', 'source']])
+    # nếu không có sản phẩm gợi ý nào
+    if all_recommendations.empty:
+        logger.debug("No recommendations; adding popular products.")
+        incr('popular_fallback', 'hybrid')
+        # gợi ý những sản phẩm được mua nhiều nhất (trong các sản phẩm thỏa bộ lọc);
+        # có aggregates thì "nhiều nhất" tính theo trọng số giảm dần (lượt mua gần đây nặng hơn)
+        allowed = filter_products(products, product_filter)
+        if aggregates is not None:
+            popular_counts = aggregates.item_popularity()
+        else:
+            popular_counts = purchases['product_id'].value_counts()
+        if product_filter is not None:
+            popular_counts = popular_counts[popular_counts.index.isin(allowed['product_id'])]
+        popular_products = popular_counts.head(3).index
+        all_recommendations = allowed[allowed['product_id'].isin(popular_products) &
+                                      ~allowed['product_id'].isin(user_history)].copy()
+        # đặt điểm của các sản phẩm đó là 0.5
+        all_recommendations['score'] = 0.5
+        all_recommendations['source'] = 'Popular Products'
+    with timed('filtering', 'hybrid'):
+        # gợi ý cuối cùng là sắp xếp all_recommendations thep thứ tự giảm dần của score, loại bỏ những sp bị lặp, chỉ giữ cái đầu tiên
+        final_recommendations = all_recommendations.sort_values(by='score', ascending=False) \
+                                                   .drop_duplicates(subset=['product_id'], keep='first')  
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Final hybrid recommendations:\n%s", final_recommendations[['product_id', 'score', 'source']])
+    
+    return final_recommendations
@@ -0,0 +1,171 @@
+# ------------------------------------------------------------
+# Chạy thuật toán gợi ý với giới hạn thời gian (deadline) và hạ cấp dần khi quá hạn/lỗi.
+#   - Thuật toán được yêu cầu chạy trong thread pool; request chỉ chờ tối đa budget của
+#     thuật toán đó (vd: multi-modal 2s, hybrid 0.5s).
+#   - Quá hạn hoặc lỗi -> thử các thuật toán RẺ HƠN theo FALLBACKS của thuật toán đó
+#     (vd: multi-modal -> hybrid -> collaborative; content-based vốn đã rẻ nhất nên không có), cả chuỗi
+#     dùng chung `fallback_budget`; cuối cùng là danh sách sản phẩm phổ biến tính sẵn trong
+#     snapshot (không bao giờ quá hạn).
+#     => độ trễ tối đa của một request ~ budget + fallback_budget, kể cả khi server quá tải.
+#   - Mỗi lần hạ cấp được ghi vào metrics: incr('fallback', <thuật toán gốc>) và
+#     incr('fallback_to_<thuật toán thay thế>', <thuật toán gốc>), cùng với 'timeout'/'error'.
+#   - Thread đã quá hạn không bị hủy (Python không dừng được thread), nó chạy nốt rồi bị bỏ
+#     kết quả; số worker giới hạn nên tải dồn thành hạ cấp chứ không thành hàng đợi dài.
+#   - Thuật toán dùng mạng neural (HEAVY: multi-modal, two-stage) chạy trong pool riêng
+#     (heavy_workers thread): lượt chạy quá hạn của chúng chỉ chiếm chỗ của nhau, không chặn
+#     thuật toán rẻ và các bước hạ cấp (vốn đều chạy ở pool còn lại).
+# Cách dùng:
+#   server = DeadlineExecutor(max_workers=8, heavy_workers=2, budgets={'multi-modal': 2.0})
+#   recs, served_by = server.run('multi-modal', {'multi-modal': f1, 'hybrid': f2, ...}, popular_fn)
+# ------------------------------------------------------------
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import pandas as pd
+
+from metrics import incr, observe
+
+logger = logging.getLogger(__name__)
+
+# budget mặc định (giây) của từng thuật toán
+DEFAULT_BUDGETS = {
+    'collaborative': 0.3,
+    'content-based': 0.3,
+    'hybrid': 0.5,
+    'session-based': 0.2,
+    'multi-modal': 2.0,
+    'two-stage': 1.0,
+}
+DEFAULT_BUDGET = 1.0
+# chuỗi hạ cấp của từng thuật toán, chỉ gồm thuật toán rẻ hơn nó, từ tốt nhất tới rẻ nhất;
+# sau cùng luôn là sản phẩm phổ biến tính sẵn. Thuật toán không có trong bảng -> popular ngay.
+# Theo benchmark.py: content-based ~3.8ms/request, collaborative ~7.6ms -> content-based không có
+# thuật toán nào rẻ hơn để hạ cấp.
+FALLBACKS = {
+    'multi-modal': ('hybrid', 'collaborative'),
+    'two-stage': ('hybrid', 'collaborative'),
+    'hybrid': ('collaborative',),
+    'content-based': (),
+    'collaborative': (),
+    'session-based': (),
+}
+POPULAR = 'popular'
+# thuật toán chạy model neural, dùng pool riêng
+HEAVY = ('multi-modal', 'two-stage')
+
+
+def parse_budgets(text: str) -> dict:
+    """Chuỗi 'multi-modal=2,two-stage=1.5' (vd: từ biến môi trường) -> {thuật toán: giây}."""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        name, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid budget entry: {item!r} (expected name=seconds)")
+        budgets[name.strip()] = float(value)
+    return budgets
+
+
+def popular_recommendation(popular_counts: pd.Series, products: pd.DataFrame, exclude=(),
+                           product_filter=None, k: int = 20) -> pd.DataFrame:
+    """
+    Gợi ý từ danh sách sản phẩm phổ biến tính sẵn (product_id -> số lượt mua, sắp giảm dần),
+    bỏ sản phẩm trong `exclude` và sản phẩm không thỏa product_filter (mask theo dòng products).
+    """
+    allowed = products if product_filter is None else products[product_filter]
+    counts = popular_counts[~popular_counts.index.isin(exclude)]
+    counts = counts[counts.index.isin(allowed['product_id'])].head(k)
+    recommendations = allowed[allowed['product_id'].isin(counts.index)].copy()
+    recommendations['score'] = recommendations['product_id'].map(counts).astype(float) / counts.max()
+    recommendations['source'] = 'Popular Products'
+    return recommendations.sort_values(by='score', ascending=False)
+
+
+class DeadlineExecutor:
+    """
+    Thread pool chạy hàm gợi ý với deadline theo thuật toán.
+    - max_workers: số thread cho thuật toán rẻ và chuỗi hạ cấp; giới hạn số lượt tính đồng thời
+      (kể cả lượt đã quá hạn còn chạy nốt)
+    - heavy_workers: số thread riêng cho các thuật toán trong HEAVY
+    - budgets: {thuật toán: giây}, ghi đè DEFAULT_BUDGETS
+    - fallback_budget: tổng thời gian (giây) cho cả chuỗi hạ cấp
+    """
+
+    def __init__(self, max_workers: int = 4, budgets: dict = None, fallback_budget: float = 0.5,
+                 heavy_workers: int = 2):
+        self.max_workers = max_workers
+        self.heavy_workers = heavy_workers
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.fallback_budget = fallback_budget
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._pid = None
+
+    def _executor(self, algorithm: str) -> ThreadPoolExecutor:
+        # tạo pool lười và tạo lại sau fork (thread của process cha không sang worker gunicorn)
+        kind = 'heavy' if algorithm in HEAVY else 'light'
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pools, self._pid = {}, os.getpid()
+            if kind not in self._pools:
+                workers = self.heavy_workers if kind == 'heavy' else self.max_workers
+                self._pools[kind] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'recommend-{kind}')
+            return self._pools[kind]
+
+    def budget(self, algorithm: str) -> float:
+        return self.budgets.get(algorithm, DEFAULT_BUDGET)
+
+    def _call(self, algorithm: str, fn, timeout: float):
+        """Chạy fn trong pool, chờ tối đa timeout giây. Trả về kết quả hoặc None nếu quá hạn/lỗi."""
+        if timeout <= 0:
+            incr('timeout', algorithm)
+            return None
+        future = self._executor(algorithm).submit(fn)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()  # chỉ hủy được nếu chưa bắt đầu chạy
+            incr('timeout', algorithm)
+            logger.warning("%s exceeded its %.2fs budget", algorithm, timeout)
+        except Exception as e:
+            incr('error', algorithm)
+            logger.error("%s failed: %s", algorithm, e)
+        return None
+
+    def run(self, algorithm: str, recommenders: dict, popular):
+        """
+        Chạy recommenders[algorithm] trong budget của nó; quá hạn/lỗi thì hạ cấp theo FALLBACKS[algorithm]
+        (bỏ qua thuật toán không có trong recommenders), rồi tới popular().
+        Trả về (DataFrame gợi ý, tên thuật toán đã phục vụ).
+        """
+        start = time.perf_counter()
+        result = self._call(algorithm, recommenders[algorithm], self.budget(algorithm))
+        served_by = algorithm
+        if result is None:
+            incr('fallback', algorithm)
+            chain = FALLBACKS.get(algorithm, ())
+            deadline = time.perf_counter() + self.fallback_budget
+            for name in chain:
+                if name not in recommenders:
+                    continue
+                timeout = min(self.budget(name), deadline - time.perf_counter())
+                result = self._call(name, recommenders[name], timeout)
+                if result is not None:
+                    served_by = name
+                    break
+            if result is None:
+                # danh sách tính sẵn: chỉ lọc, không có gì để quá hạn
+                result, served_by = popular(), POPULAR
+            incr(f'fallback_to_{served_by}', algorithm)
+            logger.info("Served %s request with %s fallback", algorithm, served_by)
+        observe('serve', time.perf_counter() - start, algorithm)
+        return result, served_by
+
+    def shutdown(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+            self._pools = {}
@@ -0,0 +1,247 @@
+# ------------------------------------------------------------
+# Dữ liệu chỉ-đọc dùng chung cho nhiều worker (Gunicorn/uWSGI nhiều process).
+# Vấn đề: mỗi worker tự đọc 5 CSV -> cột object (product_id, timestamp, image_path)
+# là hàng nghìn object Python; refcount chạm vào chúng làm hỏng copy-on-write,
+# nên N worker ~ N bản sao bộ nhớ.
+# Cách làm ở đây:
+#   - mọi cột chuỗi được mã hóa thành mã số (categorical codes) + một bảng từ vựng,
+#     cột timestamp thành int64 (ns), cột số giữ nguyên;
+#   - các mảng numpy này nằm trong multiprocessing.shared_memory, DataFrame của
+#     mỗi worker chỉ là "view" lên các khối đó (không copy);
+#   - manifest (tên khối, dtype, độ dài) có thể ghi ra file JSON để process khác
+#     attach ngay mà không cần đọc lại CSV.
+# Cách dùng (xem gunicorn.conf.py):
+#   RECSYS_SHARED_DATA=1 gunicorn -c gunicorn.conf.py "app(2):app"   # app(2).py được import bằng tên
+# ------------------------------------------------------------
+
+import atexit
+import json
+import logging
+import os
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATA_FILES = {
+    'users': 'users_expanded.csv',
+    'products': 'products_expanded.csv',
+    'product_images': 'product_images_expanded.csv',
+    'purchases': 'purchases_expanded.csv',
+    'browsing_history': 'browsing_history_expanded.csv',
+}
+
+# các cột này dùng chung một bảng từ vựng giữa các bảng để isin/merge so sánh trên cùng categories
+SHARED_VOCAB_COLUMNS = ('product_id',)
+DATETIME_COLUMNS = ('timestamp',)
+
+
+def load_csv_frames(data_dir: str = '.') -> dict:
+    """Đọc 5 file CSV của repo thành dict {tên bảng: DataFrame}."""
+    frames = {}
+    for key, filename in DATA_FILES.items():
+        frames[key] = pd.read_csv(os.path.join(data_dir, filename))
+    return frames
+
+
+def _code_dtype(num_categories: int):
+    # giống quy tắc chọn dtype của pandas cho Categorical.codes -> from_codes không phải copy
+    if num_categories < np.iinfo(np.int8).max:
+        return np.int8
+    if num_categories < np.iinfo(np.int16).max:
+        return np.int16
+    if num_categories < np.iinfo(np.int32).max:
+        return np.int32
+    return np.int64
+
+
+def _encode(frames: dict):
+    """
+    Chuyển dict DataFrame thành các mảng numpy thuần.
+    Trả về (arrays, vocabs, layout):
+      - arrays: {(bảng, cột): np.ndarray}
+      - vocabs: {tên từ vựng: np.ndarray kiểu '<U..'}
+      - layout: {bảng: [(cột, kind, tên từ vựng hoặc None)]}, kind thuộc numeric/category/datetime
+    """
+    vocabs, arrays, layout = {}, {}, {}
+
+    # từ vựng chung cho product_id trên mọi bảng
+    for col in SHARED_VOCAB_COLUMNS:
+        values = [df[col].dropna().astype(str) for df in frames.values() if col in df.columns]
+        if values:
+            vocabs[col] = np.asarray(pd.unique(pd.concat(values, ignore_index=True)), dtype=str)
+
+    for name, df in frames.items():
+        layout[name] = []
+        for col in df.columns:
+            series = df[col]
+            if col in DATETIME_COLUMNS:
+                arrays[(name, col)] = pd.to_datetime(series).to_numpy(dtype='datetime64[ns]').view(np.int64)
+                layout[name].append((col, 'datetime', None))
+            elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                arrays[(name, col)] = series.to_numpy()
+                layout[name].append((col, 'numeric', None))
+            else:
+                vocab_key = col if col in vocabs else f'{name}.{col}'
+                if vocab_key not in vocabs:
+                    vocabs[vocab_key] = np.asarray(pd.unique(series.dropna().astype(str)), dtype=str)
+                categories = pd.Index(vocabs[vocab_key])
+                codes = pd.Categorical(series.where(series.isna(), series.astype(str)), categories=categories).codes
+                arrays[(name, col)] = codes.astype(_code_dtype(len(categories)))
+                layout[name].append((col, 'category', vocab_key))
+    return arrays, vocabs, layout
+
+
+def _attach_block(name: str, forked: bool = False) -> shared_memory.SharedMemory:
+    # process fork từ process tạo khối dùng chung resource_tracker với nó: attach bình thường
+    if forked:
+        return shared_memory.SharedMemory(name=name)
+    # process độc lập chỉ attach không được tự unlink khối khi thoát (lỗi resource_tracker trước Python 3.13)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def create_shared_array(array: np.ndarray, name: str = None):
+    """
+    Chép `array` vào một khối shared memory mới.
+    Trả về (shm, spec); spec = {'shm', 'dtype', 'shape'} đủ để process khác attach_shared_array.
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, {'shm': shm.name, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+
+def attach_shared_array(spec: dict, writeable: bool = False, forked: bool = False):
+    """
+    Map lại khối shared memory theo spec; trả về (shm, array). Giữ shm sống khi còn dùng array.
+    Mặc định array chỉ-đọc; writeable=True khi cần bọc bằng torch.from_numpy (torch cảnh báo với mảng chỉ-đọc).
+    forked=True khi process hiện tại được fork từ process đã tạo khối (vd: worker của ProcessPoolExecutor).
+    """
+    shm = _attach_block(spec['shm'], forked)
+    array = np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=shm.buf)
+    array.flags.writeable = writeable
+    return shm, array
+
+
+class SharedFrames:
+    """
+    Tập DataFrame chỉ-đọc nằm trong shared memory.
+    - SharedFrames.create(frames): process cha mã hóa và chép dữ liệu vào shared memory (chỉ 1 lần)
+    - SharedFrames.attach(manifest): worker/process khác map lại các khối, không đọc CSV
+    - .frames(): dict DataFrame là view lên các khối shared memory
+    """
+
+    def __init__(self, manifest: dict, blocks: dict, owner: bool):
+        self.manifest = manifest
+        self._blocks = blocks
+        self._owner_pid = os.getpid() if owner else None
+        self._frames = None
+
+    @classmethod
+    def create(cls, frames: dict, prefix: str = None) -> 'SharedFrames':
+        arrays, vocabs, layout = _encode(frames)
+        prefix = prefix or f'recsys_{os.getpid()}'
+        blocks, manifest = {}, {'arrays': {}, 'vocabs': {}, 'layout': layout}
+
+        def put(block_name, array):
+            shm, spec = create_shared_array(array, block_name)
+            blocks[block_name] = shm
+            return {'shm': block_name, 'dtype': spec['dtype'], 'length': len(array)}
+
+        for i, (vocab_key, vocab) in enumerate(vocabs.items()):
+            manifest['vocabs'][vocab_key] = put(f'{prefix}_v{i}', vocab)
+        for i, ((table, col), array) in enumerate(arrays.items()):
+            manifest['arrays'][f'{table}/{col}'] = put(f'{prefix}_a{i}', array)
+        total = sum(shm.size for shm in blocks.values())
+        logger.info("Placed %d arrays (%.1f MB) in shared memory", len(blocks), total / 1e6)
+        return cls(manifest, blocks, owner=True)
+
+    @classmethod
+    def attach(cls, manifest: dict) -> 'SharedFrames':
+        blocks = {}
+        for entry in list(manifest['vocabs'].values()) + list(manifest['arrays'].values()):
+            blocks[entry['shm']] = _attach_block(entry['shm'])
+        return cls(manifest, blocks, owner=False)
+
+    def save_manifest(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+
+    def _array(self, entry: dict) -> np.ndarray:
+        array = np.ndarray((entry['length'],), dtype=np.dtype(entry['dtype']),
+                           buffer=self._blocks[entry['shm']].buf)
+        array.flags.writeable = False
+        return array
+
+    def frames(self) -> dict:
+        """Dựng (một lần) các DataFrame view lên shared memory."""
+        if self._frames is not None:
+            return self._frames
+        categories = {key: pd.Index(self._array(entry).astype(object))
+                      for key, entry in self.manifest['vocabs'].items()}
+        frames = {}
+        for table, columns in self.manifest['layout'].items():
+            data = {}
+            for col, kind, vocab_key in columns:
+                array = self._array(self.manifest['arrays'][f'{table}/{col}'])
+                if kind == 'category':
+                    values = pd.Categorical.from_codes(array, categories=categories[vocab_key])
+                elif kind == 'datetime':
+                    values = array.view('datetime64[ns]')
+                else:
+                    values = array
+                data[col] = pd.Series(values, copy=False)
+            frames[table] = pd.DataFrame(data, copy=False)
+        self._frames = frames
+        return frames
+
+    def close(self):
+        self._frames = None
+        for shm in self._blocks.values():
+            shm.close()
+
+    def unlink(self):
+        # chỉ process đã tạo ra các khối mới được xóa (worker fork từ cha thì bỏ qua)
+        if self._owner_pid == os.getpid():
+            for shm in self._blocks.values():
+                shm.unlink()
+
+
+def prefork_load(data_dir: str = '.', manifest_path: str = None) -> SharedFrames:
+    """
+    Nạp dữ liệu cho chế độ nhiều worker.
+    Nếu manifest_path đã tồn tại (một process khác đã nạp), attach ngay vào các khối đó;
+    ngược lại đọc CSV, đưa vào shared memory và (nếu có manifest_path) ghi manifest ra file.
+    """
+    if manifest_path and os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        try:
+            shared = SharedFrames.attach(manifest)
+            logger.info("Attached to shared data from %s", manifest_path)
+            return shared
+        except FileNotFoundError:
+            logger.warning("Stale manifest %s; reloading CSV files", manifest_path)
+
+    shared = SharedFrames.create(load_csv_frames(data_dir))
+    if manifest_path:
+        shared.save_manifest(manifest_path)
+    atexit.register(_cleanup, shared, manifest_path)
+    return shared
+
+
+def _cleanup(shared: SharedFrames, manifest_path: str = None):
+    # chỉ chạy ở process đã tạo dữ liệu; worker fork ra cũng thừa hưởng atexit nhưng bị bỏ qua
+    if shared._owner_pid != os.getpid():
+        return
+    shared.close()
+    shared.unlink()
+    if manifest_path and os.path.exists(manifest_path):
+        os.remove(manifest_path)
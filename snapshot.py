@@ -0,0 +1,190 @@
+# ------------------------------------------------------------
+# Nạp lại dữ liệu (hot reload) cho web server đang chạy, không cần restart.
+#   - DataSnapshot: một phiên bản dữ liệu bất biến gồm 5 DataFrame, các index tra cứu
+#     (lịch sử mua/xem theo user, tập user, bảng chuyển tiếp theo phiên, chỉ mục láng
+#     giềng user, bitmap thuộc tính sản phẩm, độ phổ biến giảm dần theo thời gian, sản phẩm
+#     phổ biến cho gợi ý dự phòng, danh sách sản phẩm cho trang chủ) và model.
+#     Chỉ mục láng giềng user chỉ được dựng khi user_index=True, bảng tổng hợp giảm dần theo
+#     thời gian chỉ khi time_decay=True; bảng tổng hợp được dựng lại từ toàn bộ lượt mua ở
+#     mỗi lần nạp snapshot (web không gọi InteractionAggregates.add()).
+#   - SnapshotManager: thread nền theo dõi các CSV; khi có bộ dữ liệu mới (và đã ghi xong)
+#     thì dựng snapshot mới NGOÀI luồng request, rồi đổi tham chiếu `current` một lần
+#     (phép gán atomic). Request đang chạy vẫn giữ snapshot cũ tới khi xong.
+# Cách dùng:
+#   snapshots = SnapshotManager('.', model_factory=...)
+#   snapshots.start()
+#   snap = snapshots.current()   # lấy một lần ở đầu request, dùng suốt request
+# ------------------------------------------------------------
+
+import logging
+import os
+import threading
+import time
+
+from aggregates import InteractionAggregates
+from attribute_index import ProductAttributeIndex
+from session_recommender import DEFAULT_SESSION_GAP, DEFAULT_TOP_N, SessionIndex
+from user_index import UserNeighborIndex
+from shared_data import DATA_FILES, load_csv_frames
+
+logger = logging.getLogger(__name__)
+
+
+class DataSnapshot:
+    """Một phiên bản dữ liệu đã dựng xong index; không sửa sau khi tạo."""
+
+    def __init__(self, version: int, frames: dict, fingerprint=None, model=None,
+                 session_gap=DEFAULT_SESSION_GAP, session_top_n: int = DEFAULT_TOP_N, user_index: bool = False,
+                 time_decay: bool = False):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.users = frames['users']
+        self.products = frames['products']
+        self.product_images = frames['product_images']
+        self.purchases = frames['purchases']
+        self.browsing_history = frames['browsing_history']
+        self.model = model
+
+        # index tra cứu dùng trong request: {user_id: mảng product_id}
+        self.user_ids = frozenset(self.users['user_id'].tolist())
+        self.purchased_by_user = self._group(self.purchases)
+        self.browsed_by_user = self._group(self.browsing_history)
+        # bảng chuyển tiếp sản phẩm -> sản phẩm kế tiếp cho gợi ý theo phiên (session_recommender.py)
+        self.session_index = SessionIndex.build(self.browsing_history, session_gap, session_top_n)
+        # chỉ mục láng giềng user (MinHash/LSH) cho collaborative filtering (user_index.py);
+        # None khi collaborative dùng cách tính chính xác (không tra láng giềng)
+        self.user_index = UserNeighborIndex.build(self.purchases, self.browsing_history) if user_index else None
+        # bitmap category/price/rating cho gợi ý có bộ lọc (attribute_index.py)
+        self.attribute_index = ProductAttributeIndex(self.products)
+        # trọng số mua giảm dần theo thời gian + số lượt theo cửa sổ 24h/7d/30d (aggregates.py);
+        # None khi tắt time decay (tránh dict theo user trong process cha ở chế độ shared memory)
+        self.aggregates = InteractionAggregates.build(self.purchases) if time_decay else None
+        # số lượt mua theo sản phẩm (giảm dần): gợi ý dự phòng khi thuật toán quá hạn (serving.py)
+        popular_counts = self.purchases['product_id'].value_counts()
+        self.popular_counts = popular_counts[popular_counts > 0]
+        # danh sách sản phẩm cho trang chủ, chỉ chuyển sang dict một lần
+        self.product_records = self.products.to_dict(orient='records')
+
+    @staticmethod
+    def _group(events):
+        return events.groupby('user_id', observed=True)['product_id'].unique().to_dict()
+
+    @property
+    def num_users(self) -> int:
+        return self.users['user_id'].nunique()
+
+    @property
+    def num_products(self) -> int:
+        return self.products['product_id'].nunique()
+
+
+def data_fingerprint(data_dir: str):
+    """(mtime_ns, size) của các CSV; thay đổi khi có dữ liệu mới, None nếu thiếu file."""
+    fingerprint = []
+    for filename in DATA_FILES.values():
+        try:
+            stat = os.stat(os.path.join(data_dir, filename))
+        except FileNotFoundError:
+            return None
+        fingerprint.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+class SnapshotManager:
+    """
+    Giữ snapshot hiện tại và nạp lại ở thread nền.
+    - model_factory(num_users, num_products): tạo model cho snapshot; model cũ được dùng lại
+      nếu số user/sản phẩm không đổi (tránh dựng lại ResNet/SentenceTransformer)
+    - session_gap, session_top_n: tham số bảng chuyển tiếp theo phiên (xem session_recommender.py)
+    - user_index: dựng chỉ mục láng giềng user (user_index.py) cho mỗi snapshot
+    - time_decay: dựng bảng tổng hợp giảm dần theo thời gian (aggregates.py) cho mỗi snapshot
+    - poll_interval: chu kỳ kiểm tra (giây). Một bộ dữ liệu chỉ được nạp khi fingerprint
+      giống nhau ở 2 lần kiểm tra liên tiếp, tức là các file đã ghi xong.
+    """
+
+    def __init__(self, data_dir: str = '.', model_factory=None, poll_interval: float = 30.0,
+                 initial_frames: dict = None, session_gap=DEFAULT_SESSION_GAP, session_top_n: int = DEFAULT_TOP_N,
+                 user_index: bool = False, time_decay: bool = False):
+        self.data_dir = data_dir
+        self.session_gap = session_gap
+        self.session_top_n = session_top_n
+        self.user_index = user_index
+        self.time_decay = time_decay
+        self.model_factory = model_factory
+        self.poll_interval = poll_interval
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pending = None
+
+        if initial_frames is not None:
+            self._current = self._build(initial_frames, fingerprint=None, previous=None)
+        else:
+            fingerprint = data_fingerprint(data_dir)
+            self._current = self._build(load_csv_frames(data_dir), fingerprint, previous=None)
+
+    def current(self) -> DataSnapshot:
+        return self._current
+
+    def _build(self, frames: dict, fingerprint, previous) -> DataSnapshot:
+        version = previous.version + 1 if previous is not None else 1
+        snapshot = DataSnapshot(version, frames, fingerprint, session_gap=self.session_gap,
+                                session_top_n=self.session_top_n, user_index=self.user_index,
+                                time_decay=self.time_decay)
+        if self.model_factory is not None:
+            if previous is not None and previous.model is not None and \
+                    (previous.num_users, previous.num_products) == (snapshot.num_users, snapshot.num_products):
+                snapshot.model = previous.model
+            else:
+                snapshot.model = self.model_factory(snapshot.num_users, snapshot.num_products)
+        return snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Kiểm tra và nạp dữ liệu mới nếu có. Trả về True khi đã đổi sang snapshot mới.
+        Chỉ một lần nạp chạy tại một thời điểm; request không bao giờ bị chặn bởi hàm này.
+        """
+        with self._reload_lock:
+            fingerprint = data_fingerprint(self.data_dir)
+            if fingerprint is None:
+                return False
+            if not force:
+                if fingerprint == self._current.fingerprint:
+                    self._pending = None
+                    return False
+                # chờ fingerprint ổn định qua 2 lần kiểm tra (file đang được ghi dở)
+                if fingerprint != self._pending:
+                    self._pending = fingerprint
+                    return False
+            start = time.perf_counter()
+            try:
+                snapshot = self._build(load_csv_frames(self.data_dir), fingerprint, self._current)
+            except Exception as e:
+                # dữ liệu mới lỗi -> tiếp tục phục vụ snapshot cũ
+                logger.error("Failed to load new data snapshot: %s", e)
+                return False
+            # đổi tham chiếu: request mới thấy snapshot mới, request cũ giữ tham chiếu cũ
+            self._current = snapshot
+            self._pending = None
+            logger.info("Swapped to data snapshot v%d in %.1fs", snapshot.version, time.perf_counter() - start)
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error("Snapshot reload loop error: %s", e)
+
+    def start(self):
+        """Chạy thread nền kiểm tra dữ liệu mới (daemon, không giữ process khi thoát)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snapshot-reloader', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
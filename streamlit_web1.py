@@ -20,25 +20,16 @@ import numpy as np
 import logging
 import os
 
-# Cố gắng import các thành phần của mô hình. Nếu thiếu phụ thuộc nặng,
-# ta vẫn cho phép chạy các thuật toán đơn giản.
-multimodal_ok = True
-try:
-    import torch
-    from model import (
-        collaborative_filtering,     # Gợi ý dựa trên người dùng tương tự (CF)
-        content_based_filtering,     # Gợi ý dựa trên nội dung/sản phẩm tương tự
-        hybrid_recommendation,       # Kết hợp CF + content-based
-        MultiModalModel              # Mô hình đa phương thức (ID + ảnh + text + đồ thị)
-    )
-except Exception as e:
-    multimodal_ok = False
-    # Nếu không import được đầy đủ, vẫn thử import các hàm cơ bản
-    try:
-        from model import collaborative_filtering, content_based_filtering, hybrid_recommendation
-    except Exception:
-        # Nếu cả các hàm cơ bản cũng không import được thì dừng hẳn
-        raise
+# Các thuật toán cổ điển chỉ cần pandas (recommenders.py), import luôn được.
+from recommenders import (
+    collaborative_filtering,     # Gợi ý dựa trên người dùng tương tự (CF)
+    content_based_filtering,     # Gợi ý dựa trên nội dung/sản phẩm tương tự
+    hybrid_recommendation,       # Kết hợp CF + content-based
+)
+# Mô hình đa phương thức chỉ được nạp khi dùng tới; ở đây chỉ kiểm tra các thư viện nặng
+# đã được cài hay chưa (không import chúng) để quyết định có hiện lựa chọn "multi-modal".
+from model import neural_stack_available
+multimodal_ok = neural_stack_available()
 
 # Cấu hình logging mức INFO để xem các thông báo trong terminal khi chạy.
 logging.basicConfig(level=logging.INFO)
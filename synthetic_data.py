@@ -0,0 +1,120 @@
+# ------------------------------------------------------------
+# Sinh dữ liệu giả lập cùng schema với các CSV của repo, ở quy mô tùy chọn.
+#   users_expanded.csv            : user_id
+#   products_expanded.csv         : product_id, product_name, category, price, rating, description
+#   purchases_expanded.csv        : user_id, product_id, timestamp
+#   browsing_history_expanded.csv : user_id, product_id, timestamp
+#   product_images_expanded.csv   : product_id, image_path
+# scale=1 ~ kích thước dữ liệu mẫu (1000 user, ~5k lượt mua, ~19k lượt xem);
+# độ phổ biến sản phẩm theo luật lũy thừa (Zipf) với số mũ `popularity_alpha`.
+# Cách chạy:
+#   python synthetic_data.py --scale 100 --out data_x100
+# ------------------------------------------------------------
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# kích thước ở scale=1, lấy theo dữ liệu mẫu của repo
+BASE_USERS = 1000
+BASE_PRODUCTS = 2500
+BASE_PURCHASES = 5350
+BASE_BROWSING = 18700
+IMAGES_PER_PRODUCT = 5
+
+CATEGORIES = ['T_Shirt', 'Pants', 'Jeans', 'Blouse', 'Polo_Shirt', 'Summer_Wear', 'Tank_Top', 'Coat']
+# tỉ lệ category giống phân bố trong product_images_expanded.csv
+CATEGORY_WEIGHTS = [0.42, 0.30, 0.10, 0.08, 0.065, 0.025, 0.0085, 0.0015]
+START = pd.Timestamp('2023-10-31')
+END = pd.Timestamp('2025-10-31')
+
+
+def _zipf_weights(n: int, alpha: float, rng: np.random.Generator) -> np.ndarray:
+    # trọng số 1/rank^alpha, hoán vị ngẫu nhiên để sản phẩm phổ biến không luôn là id nhỏ
+    weights = 1.0 / np.arange(1, n + 1) ** alpha
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _events(num_events: int, user_ids: np.ndarray, product_ids: np.ndarray,
+            product_p: np.ndarray, user_p: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+    span = (END - START).value
+    return pd.DataFrame({
+        'user_id': rng.choice(user_ids, size=num_events, p=user_p),
+        'product_id': rng.choice(product_ids, size=num_events, p=product_p),
+        'timestamp': pd.to_datetime(START.value + rng.integers(0, span, size=num_events)).floor('s'),
+    }).sort_values('timestamp', ignore_index=True)
+
+
+def generate(scale: float = 1.0, popularity_alpha: float = 1.1, user_activity_sigma: float = 0.5,
+             seed: int = 0) -> dict:
+    """
+    Sinh 5 bảng dữ liệu, trả về dict {'users', 'products', 'purchases', 'browsing_history', 'product_images'}.
+    - scale: hệ số nhân số user/sản phẩm/sự kiện so với dữ liệu mẫu
+    - popularity_alpha: độ lệch (skew) của độ phổ biến sản phẩm, càng lớn càng tập trung
+    - user_activity_sigma: độ lệch mức hoạt động giữa các user (log-normal)
+    """
+    rng = np.random.default_rng(seed)
+    num_users = max(int(BASE_USERS * scale), 1)
+    num_products = max(int(BASE_PRODUCTS * scale), 1)
+
+    user_ids = np.arange(1, num_users + 1)
+    users = pd.DataFrame({'user_id': user_ids})
+
+    product_ids = np.array([f'id_{i:08d}' for i in range(num_products)])
+    categories = rng.choice(CATEGORIES, size=num_products, p=CATEGORY_WEIGHTS)
+    products = pd.DataFrame({
+        'product_id': product_ids,
+        'product_name': [f'{c.replace("_", " ")} {i}' for i, c in enumerate(categories)],
+        'category': categories,
+        'price': rng.lognormal(mean=3.3, sigma=0.6, size=num_products).round(2),
+        'rating': rng.uniform(1.0, 5.0, size=num_products).round(1),
+        'description': [f'{c.replace("_", " ").lower()} item {i}' for i, c in enumerate(categories)],
+    })
+
+    product_p = _zipf_weights(num_products, popularity_alpha, rng)
+    user_p = rng.lognormal(0.0, user_activity_sigma, size=num_users)
+    user_p /= user_p.sum()
+    purchases = _events(int(BASE_PURCHASES * scale), user_ids, product_ids, product_p, user_p, rng)
+    browsing_history = _events(int(BASE_BROWSING * scale), user_ids, product_ids, product_p, user_p, rng)
+
+    # mỗi sản phẩm có 1 ảnh shop + vài ảnh consumer, cùng kiểu đường dẫn với dữ liệu gốc
+    counts = rng.integers(2, 2 * IMAGES_PER_PRODUCT - 1, size=num_products)
+    image_rows = []
+    for pid, category, count in zip(product_ids, categories, counts):
+        base = f'img\\CLOTHING\\{category}\\{pid}\\'
+        image_rows.append((pid, base + 'shop_01.jpg'))
+        image_rows.extend((pid, base + f'comsumer_{k:02d}.jpg') for k in range(1, count))
+    product_images = pd.DataFrame(image_rows, columns=['product_id', 'image_path'])
+
+    return {
+        'users': users,
+        'products': products,
+        'purchases': purchases,
+        'browsing_history': browsing_history,
+        'product_images': product_images,
+    }
+
+
+def write_csv(frames: dict, out_dir: str):
+    """Ghi các bảng ra thư mục với đúng tên file mà app/model đang đọc."""
+    from shared_data import DATA_FILES
+
+    os.makedirs(out_dir, exist_ok=True)
+    for key, filename in DATA_FILES.items():
+        frames[key].to_csv(os.path.join(out_dir, filename), index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sinh dữ liệu giả lập cùng schema với dữ liệu mẫu')
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--alpha', type=float, default=1.1, help='số mũ Zipf của độ phổ biến sản phẩm')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='synthetic_data')
+    args = parser.parse_args()
+
+    frames = generate(args.scale, popularity_alpha=args.alpha, seed=args.seed)
+    write_csv(frames, args.out)
+    print({key: len(df) for key, df in frames.items()})
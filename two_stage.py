@@ -0,0 +1,119 @@
+# ------------------------------------------------------------
+# Gợi ý 2 giai đoạn: sinh ứng viên bằng thuật toán nhẹ, xếp hạng lại bằng MultiModalModel.
+#   - Giai đoạn 1 (candidate generation): lấy top-N của collaborative, content-based và
+#     sản phẩm phổ biến nhất (theo số lượt mua), bỏ sản phẩm user đã mua/đã xem, gộp lại.
+#   - Giai đoạn 2 (re-ranking): chỉ các ứng viên này đi qua MultiModalModel (ID, ảnh, mô tả),
+#     điểm = mean của vector fusion giống multi_modal_recommendation.
+#   => chi phí neural mỗi request tỉ lệ với số ứng viên (tối đa 3N), không phải cả catalog.
+# Cách dùng:
+#   recs = two_stage_recommendation(user_id, model, purchases, browsing_history, products,
+#                                   product_images, num_candidates=100, popular_counts=snap.popular_counts)
+# ------------------------------------------------------------
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from metrics import timed, incr
+from attribute_index import filter_mask
+from recommenders import collaborative_filtering, content_based_filtering
+
+logger = logging.getLogger(__name__)
+
+# số ứng viên mặc định lấy từ MỖI nguồn
+DEFAULT_NUM_CANDIDATES = 100
+
+
+def generate_candidates(user_id: int, purchases: pd.DataFrame, browsing_history: pd.DataFrame,
+                        products: pd.DataFrame, num_candidates: int = DEFAULT_NUM_CANDIDATES,
+                        product_filter=None, popular_counts: pd.Series = None) -> pd.DataFrame:
+    """
+    Giai đoạn 1: top-N của từng nguồn (collaborative, content-based, popular), đã bỏ sản phẩm
+    user từng tương tác và sản phẩm không thỏa product_filter (xem attribute_index.py).
+    popular_counts: số lượt mua theo sản phẩm, sắp giảm dần (vd: DataSnapshot.popular_counts);
+    không truyền thì đếm lại từ purchases.
+    Trả về DataFrame (product_id, candidate_source); sản phẩm có ở nhiều nguồn chỉ giữ nguồn đầu tiên.
+    """
+    if isinstance(product_filter, dict):
+        product_filter = filter_mask(products, product_filter)
+    with timed('history_lookup', 'two-stage'):
+        user_history = set(purchases.loc[purchases['user_id'] == user_id, 'product_id']) | \
+            set(browsing_history.loc[browsing_history['user_id'] == user_id, 'product_id'])
+
+    collab = collaborative_filtering(user_id, purchases, products, product_filter=product_filter)
+    content = content_based_filtering(user_id, purchases, browsing_history, products, product_filter)
+    with timed('candidate_generation', 'two-stage'):
+        popular = purchases['product_id'].value_counts() if popular_counts is None else popular_counts
+        popular = popular[(popular > 0) & ~popular.index.isin(user_history)]
+        if product_filter is not None:
+            popular = popular[popular.index.isin(products.loc[product_filter, 'product_id'])]
+        popular = popular.head(num_candidates)
+
+        sources = []
+        for name, recs in (('Collaborative Filtering', collab), ('Content-Based Filtering', content)):
+            recs = recs[~recs['product_id'].isin(user_history)]
+            top = recs.nlargest(num_candidates, 'score') if not recs.empty else recs
+            sources.append(pd.DataFrame({'product_id': top['product_id'].to_numpy(), 'candidate_source': name}))
+        sources.append(pd.DataFrame({'product_id': popular.index.to_numpy(), 'candidate_source': 'Popular Products'}))
+        candidates = pd.concat(sources, ignore_index=True)
+        candidates['product_id'] = candidates['product_id'].astype(str)
+        candidates = candidates.drop_duplicates('product_id', keep='first').reset_index(drop=True)
+    logger.debug("User %s: %d candidates", user_id, len(candidates))
+    return candidates
+
+
+def rerank(user_id: int, model, candidates: pd.DataFrame, products: pd.DataFrame,
+           product_images: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Giai đoạn 2: chấm điểm các ứng viên bằng MultiModalModel, trả về các dòng products của ứng viên
+    kèm score, source, candidate_source, sắp giảm dần theo score.
+    """
+    # torch chỉ cần ở giai đoạn này: import two_stage (vd: từ app) không kéo theo stack neural
+    import torch
+
+    # chỉ số embedding sản phẩm = vị trí dòng trong products (giống multi_modal_recommendation)
+    positions = np.flatnonzero(products['product_id'].astype(str).isin(candidates['product_id']).to_numpy())
+    if len(positions) == 0:
+        incr('empty', 'two-stage')
+        return products.iloc[:0].assign(score=pd.Series(dtype=np.float64), source='Two-Stage',
+                                         candidate_source=pd.Series(dtype=object))
+    subset = products.iloc[positions].copy()
+    texts = subset['description'].astype(object).fillna("").tolist()
+    images = None
+    if product_images is not None:
+        # encode_items duyệt toàn bộ bảng ảnh -> chỉ đưa ảnh của ứng viên
+        images = product_images[product_images['product_id'].isin(subset['product_id'])]
+    with torch.no_grad():
+        outputs = model(
+            torch.LongTensor([user_id - 1]),
+            torch.as_tensor(positions, dtype=torch.long),
+            texts,
+            edge_index=None,
+            product_images_df=images,
+            image_keys=subset['product_id'].tolist()
+        )
+    subset['score'] = outputs.mean(dim=1).cpu().numpy()
+    subset['source'] = 'Two-Stage'
+    subset['candidate_source'] = subset['product_id'].astype(str).map(
+        candidates.set_index('product_id')['candidate_source'])
+    with timed('filtering', 'two-stage'):
+        return subset.sort_values(by='score', ascending=False)
+
+
+'''Hàm gợi ý 2 giai đoạn với:
+    - user_id: người dùng đang được gợi ý (user_id bắt đầu từ 1)
+    - model: MultiModalModel đã khởi tạo
+    - purchases, browsing_history, products, product_images: các dataframe như các hàm gợi ý khác
+    - num_candidates: số ứng viên lấy từ mỗi nguồn (N)
+    - product_filter (tùy chọn): mảng bool hoặc dict filter spec, áp dụng ngay từ giai đoạn 1
+    - popular_counts (tùy chọn): số lượt mua theo sản phẩm tính sẵn, tránh đếm lại purchases mỗi request'''
+def two_stage_recommendation(user_id: int, model, purchases: pd.DataFrame, browsing_history: pd.DataFrame,
+                             products: pd.DataFrame, product_images: pd.DataFrame = None,
+                             num_candidates: int = DEFAULT_NUM_CANDIDATES, product_filter=None,
+                             popular_counts: pd.Series = None) -> pd.DataFrame:
+    logger.debug("Two-Stage Recommendation for user_id: %s", user_id)
+    incr('calls', 'two-stage')
+    candidates = generate_candidates(user_id, purchases, browsing_history, products, num_candidates,
+                                     product_filter, popular_counts)
+    return rerank(user_id, model, candidates, products, product_images)
@@ -0,0 +1,139 @@
+# ------------------------------------------------------------
+# Chỉ mục láng giềng user gần đúng (MinHash + LSH) cho collaborative filtering.
+#   - Mỗi user là một tập sản phẩm đã mua/đã xem. Chữ ký MinHash gồm `num_perm` giá trị
+#     min của các hàm băm h_i(x) = (a_i * x + b_i) mod p; tỉ lệ vị trí trùng nhau giữa hai
+#     chữ ký ước lượng độ tương đồng Jaccard của hai tập.
+#   - LSH banding: chữ ký cắt thành `bands` dải, mỗi dải băm thành một bucket. Hai user chung
+#     ít nhất một bucket là ứng viên; chỉ các ứng viên này được so chữ ký.
+#   => truy vấn top-M láng giềng không phải quét toàn bộ user hay toàn bộ purchases.
+# Cách dùng:
+#   index = UserNeighborIndex.build(purchases, browsing_history)
+#   neighbors, similarity = index.neighbors(user_id, top_m=50)
+#   collaborative_filtering(user_id, purchases, products, neighbor_index=index, top_m=50)
+# ------------------------------------------------------------
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# số nguyên tố Mersenne 2^31 - 1: a * x + b vẫn nằm trong uint64 khi a, b, x < p
+_PRIME = np.uint64((1 << 31) - 1)
+# giá trị chữ ký của hàng không có phần tử (mọi giá trị băm đều < p)
+_EMPTY = _PRIME
+
+
+def minhash_signatures(rows: np.ndarray, items: np.ndarray, num_rows: int, num_perm: int = 64,
+                       seed: int = 0, chunk: int = 8) -> np.ndarray:
+    """
+    Chữ ký MinHash cho các tập cho dưới dạng cặp (rows[i], items[i]) (mã số nguyên).
+    Trả về mảng uint64 [num_rows, num_perm]; hàng không có phần tử nào mang giá trị _EMPTY.
+    Tính theo từng nhóm `chunk` hoán vị để bộ nhớ tạm chỉ cỡ len(items) x chunk.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    order = np.argsort(rows, kind='stable')
+    rows, items = rows[order], items[order].astype(np.uint64)
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.empty(0, dtype=np.int64)
+
+    signatures = np.full((num_rows, num_perm), _EMPTY, dtype=np.uint64)
+    for lo in range(0, num_perm, chunk):
+        hi = min(lo + chunk, num_perm)
+        hashes = (items[:, None] * a[lo:hi] + b[lo:hi]) % _PRIME
+        if len(starts):
+            signatures[rows[starts], lo:hi] = np.minimum.reduceat(hashes, starts, axis=0)
+    return signatures
+
+
+class UserNeighborIndex:
+    """
+    MinHash/LSH trên tập sản phẩm của từng user.
+    - user_ids: mảng user_id, vị trí là chỉ số hàng của signatures
+    - signatures: uint64 [số user, num_perm]
+    - buckets: list theo dải, mỗi phần tử là dict {khóa bucket: mảng chỉ số user}
+    """
+
+    def __init__(self, user_ids: np.ndarray, signatures: np.ndarray, bands: int, max_bucket_size: int = 1000):
+        self.user_ids = user_ids
+        self.signatures = signatures
+        self.bands = bands
+        self.rows_per_band = signatures.shape[1] // bands
+        self.max_bucket_size = max_bucket_size
+        self._position = {uid: i for i, uid in enumerate(user_ids.tolist())}
+        self.band_keys = self._band_keys(signatures)
+        self.buckets = []
+        for band in range(bands):
+            keys = self.band_keys[:, band]
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(keys) else []
+            ends = np.r_[starts[1:], len(keys)] if len(keys) else []
+            self.buckets.append({sorted_keys[s]: order[s:e] for s, e in zip(starts, ends) if e - s > 1})
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        # khóa của một dải = tổ hợp tuyến tính các giá trị trong dải (phép nhân uint64 tràn số là chủ ý)
+        r = self.rows_per_band
+        multipliers = np.random.default_rng(12345).integers(1, 1 << 62, size=r, dtype=np.uint64)
+        banded = signatures[:, :self.bands * r].reshape(len(signatures), self.bands, r)
+        with np.errstate(over='ignore'):
+            return (banded * multipliers).sum(axis=2, dtype=np.uint64)
+
+    @classmethod
+    def build(cls, purchases: pd.DataFrame, browsing_history: pd.DataFrame = None, num_perm: int = 64,
+              bands: int = 32, seed: int = 0, max_bucket_size: int = 1000) -> 'UserNeighborIndex':
+        """
+        Dựng chỉ mục từ lượt mua (và lượt xem nếu có). num_perm phải chia hết cho bands;
+        nhiều dải hơn (ít dòng mỗi dải) -> bắt được cả cặp có Jaccard thấp, nhiều ứng viên hơn.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        start = time.perf_counter()
+        events = [purchases[['user_id', 'product_id']]]
+        if browsing_history is not None:
+            events.append(browsing_history[['user_id', 'product_id']])
+        events = pd.concat(events, ignore_index=True).dropna()
+        user_codes, user_ids = pd.factorize(events['user_id'])
+        item_codes, _ = pd.factorize(events['product_id'].astype(str))
+        signatures = minhash_signatures(user_codes.astype(np.int64), item_codes.astype(np.int64),
+                                        len(user_ids), num_perm, seed)
+        index = cls(np.asarray(user_ids), signatures, bands, max_bucket_size)
+        logger.info("User index: %d users, %d perms, %d bands built in %.2fs", len(user_ids), num_perm,
+                    bands, time.perf_counter() - start)
+        return index
+
+    def candidates(self, user_id) -> np.ndarray:
+        """Chỉ số các user chung ít nhất một bucket LSH với user_id (không gồm chính user)."""
+        i = self._position.get(user_id)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        found = []
+        for band, buckets in enumerate(self.buckets):
+            members = buckets.get(self.band_keys[i, band])
+            if members is not None:
+                # bucket quá lớn (user mua toàn sản phẩm phổ biến) chỉ lấy một phần cố định
+                found.append(members[:self.max_bucket_size])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        result = np.unique(np.concatenate(found))
+        return result[result != i]
+
+    def neighbors(self, user_id, top_m: int = 50):
+        """
+        Top-M user giống user_id nhất theo Jaccard ước lượng từ chữ ký.
+        Trả về (mảng user_id, mảng độ tương đồng) sắp giảm dần.
+        """
+        cand = self.candidates(user_id)
+        if len(cand) == 0:
+            return np.empty(0, dtype=self.user_ids.dtype), np.empty(0)
+        i = self._position[user_id]
+        similarity = (self.signatures[cand] == self.signatures[i]).mean(axis=1)
+        if len(cand) > top_m:
+            keep = np.argpartition(-similarity, top_m - 1)[:top_m]
+            cand, similarity = cand[keep], similarity[keep]
+        order = np.argsort(-similarity, kind='stable')
+        return self.user_ids[cand[order]], similarity[order]